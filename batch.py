@@ -0,0 +1,205 @@
+"""
+Headless batch mode: derivation reports for many parameter sets.
+
+Reads a CSV (with a header row) or JSONL file of parameter sets with the
+columns pr, y, beta, k1, k0 (missing or empty columns are kept constant, as
+in the GUI) and writes one PDF per row or a single combined PDF.
+
+    python batch.py params.csv --out-dir reports
+    python batch.py params.jsonl --combined reports.pdf
+    laplace.exe params.csv --out-dir reports
+
+Equations are drawn as vector outlines by default; each worker keeps the
+outlines it has built, so equations that do not depend on the inputs are only
+laid out once per worker.  With --raster, equations are rendered at the
+resolution that gives --dpi pixels per inch on the page, and equations shared
+by several rows are rendered to PNG once and handed to every worker.
+"""
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab.lib.units import inch
+
+from mathrender import PRINT_DPI, cache_key, create_math_image, equation_extent, render_many, shutdown_pool
+from render_cache import default_cache
+from derivation import CONSTANT_VALUES, get_derivation_content, latex_requests
+from report import EQUATION_WIDTH, build_combined_pdf, build_pdf
+
+
+# --- Accepted column names for each input ---
+COLUMN_ALIASES = {
+    "pr": ("pr",),
+    "y": ("y",),
+    "beta": ("beta", "β"),
+    "k1": ("k1", "k1(β)", "k_1"),
+    "k0": ("k0", "ko", "ko(β)", "k_o"),
+}
+KNOWN_COLUMNS = {alias for aliases in COLUMN_ALIASES.values() for alias in aliases}
+
+
+def normalize_parameter_set(row):
+    """Maps one CSV/JSON row onto the pr, y, beta, k1, k0 string values the derivation uses."""
+    lowered = {str(key).strip().lower(): value for key, value in row.items()}
+    values = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        value = None
+        for alias in aliases:
+            if lowered.get(alias) not in (None, ""):
+                value = str(lowered[alias]).strip()
+                break
+        values[name] = value if value is not None else CONSTANT_VALUES[name]
+    return values
+
+
+def unknown_columns(rows):
+    """Names of the columns in rows that match none of COLUMN_ALIASES, sorted."""
+    return sorted({str(key).strip() for row in rows for key in row
+                   if key is not None and str(key).strip()
+                   and str(key).strip().lower() not in KNOWN_COLUMNS})
+
+
+def read_parameter_sets(path):
+    """
+    Reads a .csv or .jsonl file into a list of normalized parameter sets.
+    A UTF-8 byte order mark (as Excel writes) is skipped, and columns that are
+    not recognized are reported, since their values are not used.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        if extension in (".jsonl", ".ndjson"):
+            rows = [json.loads(line) for line in fh if line.strip()]
+        else:
+            rows = list(csv.DictReader(fh))
+    unknown = unknown_columns(rows)
+    if unknown:
+        print(f"Warning: ignoring unrecognized columns in {path}: {', '.join(unknown)} "
+              f"(expected {', '.join(COLUMN_ALIASES)})")
+    return [normalize_parameter_set(row) for row in rows]
+
+
+def derivation_for(values):
+    return get_derivation_content(values["pr"], values["y"], values["beta"], values["k1"], values["k0"])
+
+
+def raster_requests(derivation_content, print_dpi=PRINT_DPI):
+    """
+    Returns (latex_str, font_size, dpi) for each equation, with dpi chosen so the
+    image has print_dpi pixels per inch once scaled to EQUATION_WIDTH on the page.
+    """
+    page_width = EQUATION_WIDTH / inch
+    return [(latex_str, font_size, print_dpi * page_width / equation_extent(latex_str, font_size)[0])
+            for latex_str, font_size in latex_requests(derivation_content)]
+
+
+def shared_equations(contents, print_dpi=PRINT_DPI):
+    """Returns the raster requests that appear in more than one report."""
+    counts = Counter(request for content in contents
+                     for request in set(raster_requests(content, print_dpi)))
+    return [request for request, count in counts.items() if count > 1]
+
+
+# --- Worker processes ---
+
+def _init_worker(shared_pngs):
+    """Seeds the worker's render cache with the equations every report shares."""
+    for key, png_bytes in shared_pngs.items():
+        default_cache.put(key, png_bytes)
+
+
+def _write_report(job):
+    values, filename, raster, print_dpi = job
+    derivation_content = derivation_for(values)
+    img_buffers = None
+    if raster:
+        img_buffers = [create_math_image(latex_str, font_size, dpi)
+                       for latex_str, font_size, dpi in raster_requests(derivation_content, print_dpi)]
+    build_pdf(filename, values, derivation_content, img_buffers)
+    return filename
+
+
+def write_reports(parameter_sets, out_dir, workers=None, raster=False, print_dpi=PRINT_DPI):
+    """Writes report_00001.pdf, report_00002.pdf, ... into out_dir. Returns the paths."""
+    os.makedirs(out_dir, exist_ok=True)
+
+    shared_pngs = {}
+    if raster:
+        # Render the shared equations once, up front, then release the render pool
+        contents = [derivation_for(values) for values in parameter_sets]
+        shared = shared_equations(contents, print_dpi)
+        for (latex_str, font_size, dpi), buffer in zip(shared, render_many(shared)):
+            if buffer is not None:
+                shared_pngs[cache_key(latex_str, font_size, dpi)] = buffer.getvalue()
+        shutdown_pool()
+
+    jobs = [(values, os.path.join(out_dir, f"report_{index + 1:05d}.pdf"), raster, print_dpi)
+            for index, values in enumerate(parameter_sets)]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(shared_pngs,)) as pool:
+        return list(pool.map(_write_report, jobs, chunksize=chunksize))
+
+
+def write_combined_report(parameter_sets, filename, raster=False, print_dpi=PRINT_DPI):
+    """
+    Writes every parameter set into one PDF, one report per page run.
+    Reports are laid out and written one at a time; with raster, only the
+    distinct equations' PNGs are kept.
+    """
+    pngs = {}
+    if raster:
+        # One parallel render pass over the distinct equations of every report
+        unique = list(dict.fromkeys(request for values in parameter_sets
+                                    for request in raster_requests(derivation_for(values), print_dpi)))
+        for request, buffer in zip(unique, render_many(unique)):
+            pngs[request] = buffer.getvalue() if buffer is not None else None
+
+    def reports():
+        for values in parameter_sets:
+            content = derivation_for(values)
+            img_buffers = None
+            if raster:
+                img_buffers = [io.BytesIO(pngs[request]) if pngs[request] is not None else None
+                               for request in raster_requests(content, print_dpi)]
+            yield values, content, img_buffers
+
+    build_combined_pdf(filename, reports())
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate derivation PDF reports for many parameter sets.")
+    parser.add_argument("params", help="CSV (with header) or JSONL file of pr, y, beta, k1, k0 values")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--out-dir", help="write one PDF per parameter set into this directory")
+    output.add_argument("--combined", help="write all reports into this single PDF")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--raster", action="store_true", help="embed PNG equations instead of vector outlines")
+    parser.add_argument("--dpi", type=float, default=PRINT_DPI,
+                        help=f"print resolution of --raster equations (default: {PRINT_DPI})")
+    args = parser.parse_args(argv)
+
+    parameter_sets = read_parameter_sets(args.params)
+    if not parameter_sets:
+        print(f"No parameter sets found in {args.params}")
+        return 1
+
+    if args.combined:
+        write_combined_report(parameter_sets, args.combined, args.raster, args.dpi)
+        print(f"Wrote {len(parameter_sets)} reports to {args.combined}")
+    else:
+        paths = write_reports(parameter_sets, args.out_dir, args.workers, args.raster, args.dpi)
+        print(f"Wrote {len(paths)} reports to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
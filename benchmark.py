@@ -0,0 +1,277 @@
+"""
+Benchmarks for equation rendering, PDF builds and theta(y,t) evaluation.
+
+Runs headless (Agg backend, no window) and writes the timings as JSON:
+
+    python benchmark.py --out results.json
+    python benchmark.py --only theta --only 'render/eq_0*' --repeat 10
+    python benchmark.py --out new.json --baseline results.json
+
+Each case runs once as an untraced warm-up, so one-time imports and setup
+are not charged to whichever case runs first, then once with tracemalloc
+recording its peak Python and NumPy allocations, then --repeat timed runs
+(without tracemalloc).  The JSON holds the min, mean and 50/90/99th percentile
+run times and the peak memory per case.  With --baseline, cases whose median time or peak memory grew
+by more than --threshold are listed as regressions and the exit status is 1.
+
+Render and PDF cases start every run with an empty render cache and with
+mathrender.clear_caches(), so they measure cold renders.  Timed runs stop
+early once a case has used MAX_CASE_SECONDS (the JSON records how many ran).
+The derivation pass renders through the process pool like the app does; the
+workers' own parse caches stay warm between runs and memory used inside them
+is not counted.
+
+Cases:
+    render/eq_NN         create_math_image for each equation of one derivation
+    derivation           get_derivation_content + rendering every equation
+    pdf/N                vector PDF of N reports (build_pdf / build_combined_pdf)
+    theta/<method>/...   theta on grids of several sizes and parameter regimes
+"""
+import os
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import argparse
+import fnmatch
+import gc
+import json
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import matplotlib
+import numpy as np
+
+from derivation import get_derivation_content, latex_requests
+from mathrender import clear_caches, create_math_image, render_many, shutdown_pool
+from render_cache import RenderCache
+from report import build_combined_pdf, build_pdf
+from series import theta_grid
+from sweep import evaluate_grid
+
+
+# Inputs of the benchmarked derivation (the app's defaults with every value numeric)
+VALUES = {"pr": "0.71", "y": "1.0", "beta": "0.5", "k1": "2.5", "k0": "1.0"}
+
+PDF_REPORTS = (1, 10, 100)
+
+# (name, pr, beta, k1, k0) of the theta parameter regimes
+THETA_REGIMES = (
+    ("moderate", 0.71, 0.3, 2.5, 1.0),
+    ("beta_0.9", 0.71, 0.9, 2.5, 1.0),
+    ("k1_0", 0.71, 0.5, 0.0, 1.0),
+    ("large_pr", 7.0, 0.5, 1.0, 0.5),
+)
+# (n_y, n_t) grid sizes; the largest only for the fast evaluators
+THETA_GRIDS = ((50, 50), (200, 200), (1000, 1000))
+SLOW_METHODS = ("adaptive",)
+
+# Percentiles reported per case
+PERCENTILES = (50, 90, 99)
+
+DEFAULT_REPEAT = 5
+MAX_CASE_SECONDS = 60.0
+DEFAULT_THRESHOLD = 0.2
+
+
+# --- Cases ---
+
+def render_cases():
+    content = get_derivation_content(*(VALUES[name] for name in ("pr", "y", "beta", "k1", "k0")))
+    cases = []
+    for index, (latex_str, font_size) in enumerate(latex_requests(content)):
+        def run(latex_str=latex_str, font_size=font_size):
+            clear_caches()
+            create_math_image(latex_str, font_size, cache=RenderCache())
+        cases.append((f"render/eq_{index:02d}", run))
+    return cases
+
+
+def derivation_cases():
+    def run():
+        clear_caches()
+        content = get_derivation_content(*(VALUES[name] for name in ("pr", "y", "beta", "k1", "k0")))
+        render_many(latex_requests(content), cache=RenderCache())
+    return [("derivation", run)]
+
+
+def pdf_cases(directory):
+    # Distinct y per report, so the reports are not all identical
+    parameter_sets = [dict(VALUES, y=f"{0.1 * (index + 1):g}") for index in range(max(PDF_REPORTS))]
+    contents = [get_derivation_content(*(values[name] for name in ("pr", "y", "beta", "k1", "k0")))
+                for values in parameter_sets]
+    filename = os.path.join(directory, "benchmark.pdf")
+
+    cases = []
+    for count in PDF_REPORTS:
+        def run(count=count):
+            clear_caches()
+            if count == 1:
+                build_pdf(filename, parameter_sets[0], contents[0])
+            else:
+                build_combined_pdf(filename, ((parameter_sets[i], contents[i], None) for i in range(count)))
+        cases.append((f"pdf/{count}", run))
+    return cases
+
+
+def theta_cases():
+    cases = []
+    for method in ("series", "adaptive", "talbot"):
+        for regime, pr, beta, k1, k0 in THETA_REGIMES:
+            for n_y, n_t in THETA_GRIDS:
+                if method in SLOW_METHODS and n_y * n_t > 200 * 200:
+                    continue
+                y = np.linspace(0.0, 3.0, n_y)
+                t = np.geomspace(0.02, 5.0, n_t)
+
+                def run(y=y, t=t, pr=pr, beta=beta, k1=k1, k0=k0, method=method):
+                    # The fixed truncation alone, without the sweep's adaptive error check
+                    if method == "series":
+                        theta_grid(y, t, pr, beta, k1, k0)
+                    else:
+                        evaluate_grid(y, t, pr, beta, k1, k0, method)
+                cases.append((f"theta/{method}/{regime}/{n_y}x{n_t}", run))
+    return cases
+
+
+def selected(name, only):
+    """
+    True if the case name matches one of the patterns in only: the whole name,
+    a prefix ending at a "/" ("pdf" or "theta/series", but "pdf/1" is not
+    pdf/10), or a glob ("render/eq_0*").  Every case matches an empty only.
+    """
+    if not only:
+        return True
+    for pattern in only:
+        prefix = pattern.rstrip("/")
+        if name == prefix or name.startswith(prefix + "/") or fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+
+# --- Measurement ---
+
+def measure(run, repeat):
+    """
+    Returns the stats of one case: an untraced warm-up run, a traced run for the
+    peak memory, then repeat timed runs (fewer if they add up to more than
+    MAX_CASE_SECONDS).
+    """
+    run()
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        if sum(times) > MAX_CASE_SECONDS:
+            break
+
+    times = np.array(times)
+    stats = {"repeat": len(times), "min_s": float(times.min()), "mean_s": float(times.mean())}
+    for q in PERCENTILES:
+        stats[f"p{q}_s"] = float(np.percentile(times, q))
+    stats["peak_mb"] = peak / (1024 * 1024)
+    return stats
+
+
+def environment():
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+    }
+
+
+def run_benchmarks(only=None, repeat=DEFAULT_REPEAT, progress=None):
+    """
+    Runs every case selected by the patterns in only (all when only is
+    empty; see selected()).  progress(name, stats) is called after each case.
+    Returns {"environment": ..., "results": {name: stats}}.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cases = render_cases() + derivation_cases() + pdf_cases(directory) + theta_cases()
+        for name, run in cases:
+            if not selected(name, only):
+                continue
+            results[name] = measure(run, repeat)
+            if progress is not None:
+                progress(name, results[name])
+    shutdown_pool()
+    return {"environment": environment(), "results": results}
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns [(name, metric, baseline value, new value)] for every case present
+    in both whose median time or peak memory grew by more than threshold.
+    """
+    regressions = []
+    for name, stats in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        for metric in ("p50_s", "peak_mb"):
+            if stats[metric] > old[metric] * (1.0 + threshold):
+                regressions.append((name, metric, old[metric], stats[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark rendering, PDF builds and theta evaluation.")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--only", action="append", default=[],
+                        help="run only cases with this name, name prefix up to a / or glob (repeatable), "
+                             "e.g. pdf/1, theta/series, 'render/eq_0*'")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per case")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"relative growth counted as a regression (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as fh:
+                baseline = json.load(fh)
+        except (OSError, ValueError) as e:
+            print(f"Error reading baseline: {e}")
+            return 1
+
+    def progress(name, stats):
+        print(f"{name:40s} p50 {stats['p50_s'] * 1000:10.2f} ms   p90 {stats['p90_s'] * 1000:10.2f} ms"
+              f"   peak {stats['peak_mb']:8.1f} MB", flush=True)
+
+    results = run_benchmarks(args.only, args.repeat, progress)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"Wrote {len(results['results'])} results to {args.out}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            growth = f" ({new / old - 1:+.0%})" if old else ""
+            print(f"REGRESSION {name} {metric}: {old:.4g} -> {new:.4g}{growth}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
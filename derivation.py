@@ -0,0 +1,257 @@
+"""
+Derivation content shared by the GUI, the PDF reports and the batch mode.
+
+Only builds lists of text/LaTeX steps, so it is cheap to import at startup.
+"""
+
+# --- Values used when an input is kept constant (symbolic) ---
+CONSTANT_VALUES = {"pr": "Pr", "y": "y", "beta": "β", "k1": "k_1(β)", "k0": "k_o(β)"}
+
+ALL_INPUTS = ("pr", "y", "beta", "k1", "k0")
+
+
+def latex_requests(derivation_content):
+    """Returns the (latex_str, font_size) pairs to render for a derivation, in order."""
+    return [(item["content"], item.get("size", 16))
+            for item in derivation_content if item["type"] == "latex"]
+
+
+def steps_to_update(derivation_content, old_values, new_values):
+    """
+    Returns the indices of the steps whose declared inputs differ between two
+    sets of input values (every step when there are no old values).
+    """
+    if old_values is None:
+        return set(range(len(derivation_content)))
+    changed = {name for name in ALL_INPUTS if old_values.get(name) != new_values.get(name)}
+    return {index for index, item in enumerate(derivation_content)
+            if changed.intersection(item.get("inputs", ()))}
+
+
+def get_derivation_content(pr, y, beta, k1, k0):
+    """
+    Generates the derivation steps as a list of dicts.
+    Each dict has a 'type' ('text' or 'latex') and 'content'.
+    'inputs' names the values (pr, y, beta, k1, k0) the step's content
+    depends on; steps without it are the same for every input.
+    """
+
+    # Helper to format values for LaTeX
+    def f(val):
+        try:
+            # If it's a number, just return it as a string
+            float(val)
+            return val
+        except ValueError:
+            # It's a string.
+            # Handle specific known constants
+            if val == "β":
+                return r"\beta"
+            if val == "k_1(β)":
+                return r"k_1(\beta)"
+            if val == "k_o(β)":
+                return r"k_o(\beta)"
+
+            # Handle general variables
+            if val.isalpha() and len(val) > 1:
+                # e.g., "Pr" -> "\mathrm{Pr}"
+                return fr"\mathrm{{{val}}}"
+
+            # Default: return the value as is (e.g., "y")
+            return val
+
+    # --- Define formatted variables *once* for clarity ---
+    pr_val = f(pr)
+    y_val = f(y)
+    beta_val = f(beta)
+    k1_val = f(k1)
+    k0_val = f(k0)
+
+    parts = []
+
+    # --- Part 1: Eq (28) -> (29) ---
+    parts.append({
+        "type": "text", "content": f"Your specific Equation (28) is structured as:",
+        "size": 15, "weight": "bold", "pady": (5, 5)
+    })
+    parts.append({
+        "type": "latex",
+        # --- FIX: Corrected KeyError (k0_k0_val -> k0) ---
+        "content": r"\tilde{{\theta}}({y},s) = \frac{{1}}{{s}} \exp\left( -{y} \sqrt{{\frac{{ {pr} s^{{1-{beta}}} }}{{ {k1}/s + {k0} }} }} \right)".format(
+            y=y_val, pr=pr_val, beta=beta_val, k1=k1_val, k0=k0_val
+        ),
+        "size": 20, # Larger font for main equations
+        "inputs": ALL_INPUTS
+    })
+
+    # --- NEW: Add full Eq (29) ---
+    parts.append({
+        "type": "text", "content": "This is rearranged into the full series form (Eq 29):",
+        "size": 15, "weight": "bold", "pady": (10, 5)
+    })
+    parts.append({
+        "type": "latex",
+        # --- FIX: Denominator K!! -> K! l! ---
+        "content": r"\tilde{{\theta}}(y,s) = \frac{{1}}{{s}} + \sum_{{K=1}}^{{\infty}} \sum_{{l=0}}^{{\infty}} \left[ \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) s^{{1 - (1-{beta})K/2 + l}} }} \right]".format(
+            pr=pr_val, y=y_val, k1=k1_val, k0=k0_val, beta=beta_val
+        ),
+        "size": 20,
+        "inputs": ALL_INPUTS
+    })
+
+    # --- Part 2: Eq (29) -> (30) ---
+    parts.append({
+        "type": "text", "content": f"--- Step 2: Applying the Inverse Laplace Transform (Eq 30) ---",
+        "size": 16, "weight": "bold", "pady": (20, 10)
+    })
+    parts.append({
+        "type": "text", "content": "We apply the inverse Laplace transform (L⁻¹) to the general term inside the summation.\n"
+                                  "The key rule we need is:", "pady": (0, 5)
+    })
+    parts.append({
+        "type":"latex",
+        "content": r"\mathcal{{L}}^{{-1}} \left\{ \frac{{1}}{{s^v}} \right\} = \frac{{t^{{v-1}}}}{{\Gamma(v)}}",
+        "size": 18,
+        "inputs": ()
+    })
+    parts.append({
+        "type": "text", "content": "1. First, we identify the 'Constant Part' [C]:",
+        "size": 15, "weight": "bold", "pady": (10, 5)
+    })
+    parts.append({
+        "type": "latex",
+        # --- FIX: Denominator K!! -> K! l! ---
+        "content": r"[C] = \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) }}".format(
+            pr=pr_val, y=y_val, k1=k1_val, k0=k0_val
+        ),
+        "size": 18,
+        "inputs": ("pr", "y", "k1", "k0")
+    })
+    parts.append({
+        "type": "text", "content": "2. Next, we identify the 's-Part' and its exponent 'v':",
+        "size": 15, "weight": "bold", "pady": (10, 5)
+    })
+    parts.append({
+        "type": "latex",
+        "content": r"[s\text{{-Part}}] = \frac{{1}}{{s^{{1 - (1-{beta})K/2 + l}}}} \quad \Rightarrow \quad v = 1 - (1-{beta})K/2 + l".format(
+            beta=beta_val
+        ),
+        "size": 18,
+        "inputs": ("beta",)
+    })
+    parts.append({
+        "type": "text", "content": "3. We apply the rule:",
+        "size": 15, "weight": "bold", "pady": (10, 5)
+    })
+    parts.append({
+        "type": "latex",
+        "content": r"v-1 = (1 - (1-{beta})K/2 + l) - 1 = l - (1-{beta})K/2".format(
+            beta=beta_val
+        ),
+        "size": 18,
+        "inputs": ("beta",)
+    })
+    parts.append({
+        "type": "latex",
+        "content": r"\Gamma(v) = \Gamma(1 - (1-{beta})K/2 + l)".format(
+            beta=beta_val
+        ),
+        "size": 18,
+        "inputs": ("beta",)
+    })
+    parts.append({
+        "type": "text", "content": "4. Re-assembling the term [C] * t^(v-1) / Γ(v):",
+        "size": 15, "weight": "bold", "pady": (10, 5)
+    })
+    parts.append({
+        "type": "latex",
+        # --- FIX 1: Denominator K!! -> K! l! ---
+        # --- FIX 2: Exponent t^(l + ...) -> t^(l - ...) ---
+        "content": r"\frac{{[C] \cdot t^{{v-1}}}}{{\Gamma(v)}} = \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) t^{{l - (1-{beta})K/2}} }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) \Gamma(1 - (1-{beta})K/2 + l) }}".format(
+            pr=pr_val, y=y_val, k1=k1_val, k0=k0_val, beta=beta_val
+        ),
+        "size": 20,
+        "inputs": ALL_INPUTS
+    })
+
+    # --- NEW: Add the full Eq (30) ---
+    parts.append({
+        "type": "text", "content": "5. Finally, placing this back into the full solution (Eq 30):",
+        "size": 15, "weight": "bold", "pady": (10, 5)
+    })
+    parts.append({
+        "type": "latex",
+        # --- FIX 1: Denominator K!! -> K! l! ---
+        # --- FIX 2: Exponent t^(l + ...) -> t^(l - ...) ---
+        "content": r"\theta(y,t) = 1 + \sum_{{K=1}}^{{\infty}} \sum_{{l=0}}^{{\infty}} \left[ \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) t^{{l - (1-{beta})K/2}} }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) \Gamma(1 - (1-{beta})K/2 + l) }} \right]".format(
+            pr=pr_val, y=y_val, k1=k1_val, k0=k0_val, beta=beta_val
+        ),
+        "size": 20,
+        "inputs": ALL_INPUTS
+    })
+
+    # --- Part 3: Derived quantities (Eq 30 differentiated term by term) ---
+    parts.append({
+        "type": "text", "content": f"--- Step 3: Wall Heat Flux and Time Derivative ---",
+        "size": 16, "weight": "bold", "pady": (20, 10)
+    })
+    parts.append({
+        "type": "text", "content": "Eq (30) converges uniformly, so it can be differentiated term by term.\n"
+                                  "In y, only the K = 1 terms survive at the wall (y = 0), giving the surface heat flux:",
+        "pady": (0, 5)
+    })
+    parts.append({
+        "type": "latex",
+        "content": r"-\left.\frac{{\partial \theta}}{{\partial y}}\right|_{{y=0}} = \sum_{{l=0}}^{{\infty}} \frac{{ ({pr})^{{1/2}} (-1)^l ({k1})^l \Gamma(1/2 + l) t^{{l - (1-{beta})/2}} }}{{ l! ({k0})^{{1/2 + l}} \Gamma(1/2) \Gamma(1 - (1-{beta})/2 + l) }}".format(
+            pr=pr_val, k1=k1_val, k0=k0_val, beta=beta_val
+        ),
+        "size": 20,
+        "inputs": ("pr", "beta", "k1", "k0")
+    })
+    parts.append({
+        "type": "text", "content": "In t, each term uses d/dt [t^(v-1) / Γ(v)] = t^(v-2) / Γ(v-1):",
+        "pady": (10, 5)
+    })
+    parts.append({
+        "type": "latex",
+        "content": r"\frac{{\partial \theta}}{{\partial t}} = \sum_{{K=1}}^{{\infty}} \sum_{{l=0}}^{{\infty}} \left[ \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) t^{{l - (1-{beta})K/2 - 1}} }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) \Gamma(l - (1-{beta})K/2) }} \right]".format(
+            pr=pr_val, y=y_val, k1=k1_val, k0=k0_val, beta=beta_val
+        ),
+        "size": 20,
+        "inputs": ALL_INPUTS
+    })
+
+    # --- NEW: Re-instated the note about the typo ---
+    parts.append({
+        "type": "text", "content": "--- NOTE ON MATH LOGIC (TYPO IN EQ 30) ---",
+        "size": 16, "weight": "bold", "pady": (20, 10)
+    })
+    parts.append({
+        # --- FIX: Pylance Error 2 (missing 'content' key) ---
+        "type": "text",
+        "content": "Our derivation for the exponent of 't' is (v-1) = l - (1-β)K/2. This follows the Laplace rule.\n"
+                    "The paper's original Eq (30) shows the exponent as: l + (1-β)K/2.\n\n"
+                    "This is a common type of sign-flip typo in complex academic papers.",
+        "justify": "left"
+    })
+
+    # --- NEW: Add note about the k1=0, k0=1 case ---
+    parts.append({
+        "type": "text", "content": "--- Note on Simplified Case (for Graphing) ---",
+        "size": 16, "weight": "bold", "pady": (20, 10)
+    })
+    parts.append({
+        "type": "text",
+        "content": "You mentioned a simplified case for graphing where k1=0 and k0=1.\n"
+                   "If we apply this to Eq (28), the denominator (k1/s + k0) becomes 1.\n"
+                   "This simplifies the entire problem *before* the series expansion,\n"
+                   "leading to a different, simpler solution (not a double summation).",
+        "justify": "left"
+    })
+
+    parts.append({
+        "type": "text", "content": "Derivation Complete!",
+        "size": 16, "weight": "bold", "pady": (20, 20), "justify": "center"
+    })
+
+    return parts
@@ -0,0 +1,120 @@
+"""
+Diagnostics view: where the time of the recent runs went.
+
+Lists every instrumented stage (see instrument.py) with its call count and
+total/mean/max time, plus the cache and evaluation counters.  From here the
+spans can be saved as a Chrome trace, and the next Execute can be profiled
+with cProfile.
+"""
+import customtkinter as ctk
+from customtkinter import filedialog
+
+import instrument
+
+
+# How often (ms) the table is refreshed while the panel is shown
+REFRESH_MS = 1000
+
+
+class DiagnosticsPanel(ctk.CTkFrame):
+    """Frame with the per-stage timing table and the trace/profile controls."""
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        # --- Controls ---
+        controls = ctk.CTkFrame(self, fg_color="transparent")
+        controls.grid(row=0, column=0, padx=10, pady=(10, 0), sticky="ew")
+        ctk.CTkButton(controls, text="Refresh", width=90, command=self.refresh).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(controls, text="Clear", width=90, command=self.clear).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(controls, text="Save Chrome Trace…", command=self.save_trace).pack(side="left", padx=(0, 10))
+        self.profile_next = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(controls, text="Profile next Execute", variable=self.profile_next).pack(side="left")
+
+        # --- Stage table ---
+        self.text = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier", size=12), wrap="none")
+        self.text.grid(row=1, column=0, padx=10, pady=10, sticky="nsew")
+
+        self.status_label = ctk.CTkLabel(self, text="", anchor="w", justify="left")
+        self.status_label.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="ew")
+
+        self.refresh()
+        self._refresh_job = self.after(REFRESH_MS, self.auto_refresh)
+
+    def destroy(self):
+        # Stop the refresh loop, or it fires on the destroyed widgets
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+        super().destroy()
+
+    def take_profile_request(self):
+        """True (once) if the user asked for the next Execute to be profiled."""
+        if not self.profile_next.get():
+            return False
+        self.profile_next.set(False)
+        return True
+
+    def auto_refresh(self):
+        if self.winfo_ismapped():
+            self.refresh()
+        self._refresh_job = self.after(REFRESH_MS, self.auto_refresh)
+
+    def refresh(self):
+        lines = [f"{'stage':28s} {'calls':>7s} {'total ms':>11s} {'mean ms':>10s} {'max ms':>10s}"]
+        for name, calls, total, mean, longest in instrument.summary():
+            lines.append(f"{name:28s} {calls:7d} {total:11.1f} {mean:10.2f} {longest:10.2f}")
+        counters = instrument.counters()
+        if counters:
+            lines.append("")
+            lines.append(f"{'counter':28s} {'value':>12s}")
+            for name, value in sorted(counters.items()):
+                lines.append(f"{name:28s} {value:12d}")
+
+        # Keep the scroll position while the table is refreshed
+        position = self.text.yview()[0]
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        self.text.insert("1.0", "\n".join(lines))
+        self.text.configure(state="disabled")
+        self.text.yview_moveto(position)
+
+    def clear(self):
+        instrument.clear()
+        self.refresh()
+
+    def show_status(self, message, color="gray"):
+        self.status_label.configure(text=message, text_color=color)
+
+    def save_trace(self):
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("Chrome Trace", "*.json"), ("All Files", "*.*")],
+            title="Save Chrome Trace"
+        )
+        if not filename:
+            return # User cancelled
+        try:
+            instrument.dump_chrome_trace(filename)
+            self.show_status(f"Trace saved to {filename} (open in chrome://tracing or ui.perfetto.dev)")
+        except OSError as e:
+            print(f"Error saving trace: {e}")
+            self.show_status(f"Error saving trace: {e}", "red")
+
+    def save_profile(self, capture):
+        """Asks where to put a finished profile capture and writes it."""
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".prof",
+            filetypes=[("cProfile Stats", "*.prof"), ("All Files", "*.*")],
+            title="Save Profile of the Last Execute"
+        )
+        if not filename:
+            return # User cancelled
+        try:
+            capture.save(filename)
+            self.show_status(f"Profile saved to {filename} (python -m pstats {filename})")
+        except OSError as e:
+            print(f"Error saving profile: {e}")
+            self.show_status(f"Error saving profile: {e}", "red")
@@ -0,0 +1,206 @@
+"""
+Bulk export of theta(y,t) grids and the matching loader.
+
+A grid over the 1-D axes y and t is computed and written a block of y rows at
+a time, so grids larger than memory can be exported:
+
+    .csv  long format, one "y,t,theta" line per point
+    .npz  compressed, with the arrays theta, y and t (theta streamed into the zip)
+    .npy  raw theta array, written through a memory map
+
+Every export gets a small JSON sidecar (the full name plus .json, e.g.
+theta.npy.json, so exports in different formats never share one) with the
+inputs, the axes and the truncation used.  load_grid() reads any of the three
+back; .npy data comes back memory-mapped, ready for re-plotting without
+recomputation.
+As in sweep.py, adaptive cells whose error estimate exceeds MAX_ERROR are
+written as NaN; the sidecar counts them.
+
+    python export.py --pr 0.71 --beta 0.3 --k1 2.5 --k0 1 \\
+        --y 0:3:3001 --t 0.05:5:2000 --out theta.npy
+"""
+import argparse
+import json
+import os
+import sys
+import zipfile
+from collections import namedtuple
+
+import numpy as np
+
+from inverse_laplace import DEFAULT_NODES
+from series import theta_adaptive, uses_wright_kernel
+from sweep import DEFAULT_METHOD, MAX_ERROR, METHODS, evaluate_grid, parse_axis
+
+
+# Points computed and written per block (bounds memory for any grid size)
+CHUNK_POINTS = 1 << 20
+
+FORMATS = (".csv", ".npz", ".npy")
+
+# (start, stop, count) of the grid exported from the app (the plot tab's ranges)
+DEFAULT_Y_AXIS = (0.0, 3.0, 301)
+DEFAULT_T_AXIS = (0.02, 5.0, 250)
+
+ThetaGrid = namedtuple("ThetaGrid", ["y", "t", "theta", "params"])
+
+
+def sidecar_path(path):
+    """Returns the JSON sidecar path that goes with an exported grid."""
+    return path + ".json"
+
+
+def _describe_axis(values):
+    """A linspace description when it reproduces the axis exactly, else the values."""
+    if values.size > 1 and np.array_equal(values, np.linspace(values[0], values[-1], values.size)):
+        return {"start": float(values[0]), "stop": float(values[-1]), "count": int(values.size)}
+    return [float(v) for v in values]
+
+
+def _read_axis(description):
+    if isinstance(description, dict):
+        return np.linspace(description["start"], description["stop"], description["count"])
+    return np.array(description, dtype=float)
+
+
+def _truncation(y, t, k1, k0, method, tol):
+    if method == "talbot":
+        return {"nodes": DEFAULT_NODES}
+    if uses_wright_kernel(y, t, k1, k0):
+        return {"kernel": "wright"}
+    return {"kernel": "double series", "tol": tol}
+
+
+def _row_blocks(y, t, pr, beta, k1, k0, method, tol, truncation):
+    """
+    Yields (row_start, block) for blocks of y rows; records the adaptive
+    error/terms and the number of NaN cells in truncation.
+    """
+    rows = max(1, CHUNK_POINTS // max(1, t.size))
+    truncation["nan_cells"] = 0
+    for start in range(0, y.size, rows):
+        y_block = y[start:start + rows]
+        if method == "adaptive":
+            result = theta_adaptive(y_block[:, None], t[None, :], pr, beta, k1, k0, tol=tol)
+            errors = result.error[~np.isnan(result.error)]
+            if errors.size:
+                truncation["max_error"] = max(truncation.get("max_error", 0.0), float(errors.max()))
+            truncation["max_k_terms"] = max(truncation.get("max_k_terms", 0), int(result.k_terms.max()))
+            with np.errstate(invalid="ignore"):
+                block = np.where(result.error <= MAX_ERROR, result.value, np.nan)
+        else:
+            block = evaluate_grid(y_block, t, pr, beta, k1, k0, method)
+        truncation["nan_cells"] += int(np.isnan(block).sum())
+        yield start, block
+
+
+def _write_csv(path, y, t, blocks):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        fh.write("y,t,theta\n")
+        for start, block in blocks:
+            y_block = y[start:start + block.shape[0]]
+            rows = np.column_stack([np.repeat(y_block, t.size), np.tile(t, y_block.size), block.ravel()])
+            np.savetxt(fh, rows, delimiter=",", fmt="%.17g")
+
+
+def _write_npy(path, y, t, blocks):
+    theta = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(y.size, t.size))
+    for start, block in blocks:
+        theta[start:start + block.shape[0]] = block
+    theta.flush()
+    del theta
+
+
+def _write_npz(path, y, t, blocks):
+    header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.float64)),
+              "fortran_order": False, "shape": (y.size, t.size)}
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        # theta is streamed into its member block by block, like savez_compressed would store it
+        with zf.open("theta.npy", "w", force_zip64=True) as fh:
+            np.lib.format.write_array_header_1_0(fh, header)
+            for _, block in blocks:
+                fh.write(np.ascontiguousarray(block, dtype=np.float64).tobytes())
+        for name, values in (("y", y), ("t", t)):
+            with zf.open(f"{name}.npy", "w") as fh:
+                np.lib.format.write_array(fh, values)
+
+
+def export_grid(path, y, t, pr, beta, k1, k0, method=DEFAULT_METHOD, tol=1e-10):
+    """
+    Computes theta on the outer grid of y and t and writes it to path; the
+    format follows the extension (.csv, .npz or .npy).  Returns the sidecar
+    parameters that were written next to it.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported export format {extension!r}; use {', '.join(FORMATS)}")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    y = np.atleast_1d(np.asarray(y, dtype=float))
+    t = np.atleast_1d(np.asarray(t, dtype=float))
+
+    truncation = _truncation(y, t, k1, k0, method, tol)
+    blocks = _row_blocks(y, t, pr, beta, k1, k0, method, tol, truncation)
+    writer = {".csv": _write_csv, ".npz": _write_npz, ".npy": _write_npy}[extension]
+    writer(path, y, t, blocks)
+
+    params = {
+        "pr": float(pr), "beta": float(beta), "k1": float(k1), "k0": float(k0),
+        "method": method, "truncation": truncation,
+        "format": extension[1:], "shape": [int(y.size), int(t.size)],
+        "y": _describe_axis(y), "t": _describe_axis(t),
+    }
+    with open(sidecar_path(path), "w", encoding="utf-8") as fh:
+        json.dump(params, fh, indent=2)
+    return params
+
+
+def load_grid(path):
+    """
+    Reads an exported grid back as ThetaGrid(y, t, theta, params).
+    .npy data is memory-mapped read-only; .npz and .csv are read into memory.
+    The axes of a .npz are the arrays stored in it, the others come from the sidecar.
+    """
+    with open(sidecar_path(path), encoding="utf-8") as fh:
+        params = json.load(fh)
+    y, t = _read_axis(params["y"]), _read_axis(params["t"])
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        theta = np.load(path, mmap_mode="r")
+    elif extension == ".npz":
+        with np.load(path) as archive:
+            theta, y, t = archive["theta"], archive["y"], archive["t"]
+    elif extension == ".csv":
+        theta = np.loadtxt(path, delimiter=",", skiprows=1, usecols=2, ndmin=1).reshape(y.size, t.size)
+    else:
+        raise ValueError(f"Unsupported export format {extension!r}; use {', '.join(FORMATS)}")
+    return ThetaGrid(y, t, theta, params)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export theta(y,t) on a grid to .csv, .npz or .npy.")
+    for name in ("pr", "beta", "k1", "k0"):
+        parser.add_argument(f"--{name}", type=float, required=True)
+    for name in ("y", "t"):
+        parser.add_argument(f"--{name}", required=True, help='comma-separated values or "start:stop:count"')
+    parser.add_argument("--out", required=True, help="output file; the extension picks the format")
+    parser.add_argument("--method", choices=METHODS, default=DEFAULT_METHOD,
+                        help=f"talbot or adaptive (double series, any k1); default: {DEFAULT_METHOD}")
+    args = parser.parse_args(argv)
+
+    try:
+        y, t = parse_axis(args.y), parse_axis(args.t)
+        params = export_grid(args.out, y, t, args.pr, args.beta, args.k1, args.k0, args.method)
+    except ValueError as e:
+        print(f"Error exporting grid: {e}")
+        return 1
+    print(f"Wrote {y.size}x{t.size} grid to {args.out}")
+    if params["truncation"]["nan_cells"]:
+        print(f"Warning: {params['truncation']['nan_cells']} cells did not reach the error tolerance "
+              f"{MAX_ERROR:g} and are stored as NaN.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+Lightweight timing spans and counters for the app's stages.
+
+    with span("render.mathtext", dpi=dpi):
+        ...
+    count("theta.series_points", y.size * t.size)
+
+Finished spans go into a fixed-size ring buffer (the oldest are dropped), so
+instrumentation can stay on permanently; a span costs two perf_counter_ns
+calls and a deque append.  summary() aggregates the buffer per stage for the
+diagnostics panel and dump_chrome_trace() writes it in the Chrome trace-event
+format (chrome://tracing, https://ui.perfetto.dev).
+
+ProfileCapture is the opt-in cProfile mode: each thread taking part in one run
+profiles itself and the per-thread profiles are merged into one .prof file.
+
+Only the standard library is used, so this is cheap to import at startup.
+Work done in the render pool's worker processes is not recorded there; the
+parent records how long each pooled render took from submit to result.
+"""
+import cProfile
+import functools
+import json
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# Spans kept in the ring buffer
+RING_SIZE = 20000
+
+# (name, start_ns, duration_ns, thread id, args or None)
+_spans = deque(maxlen=RING_SIZE)
+_counters = {}
+_lock = threading.Lock()
+_T0_NS = time.perf_counter_ns()
+
+
+def now_ns():
+    return time.perf_counter_ns()
+
+
+def record(name, start_ns, end_ns, args=None):
+    """Adds a span that was timed by the caller (e.g. across threads)."""
+    _spans.append((name, start_ns, end_ns - start_ns, threading.get_ident(), args))
+
+
+@contextmanager
+def span(name, **args):
+    """Times the enclosed block as one span; keyword arguments are kept with it."""
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        _spans.append((name, start, time.perf_counter_ns() - start, threading.get_ident(), args or None))
+
+
+def timed(name):
+    """Decorator form of span() for whole functions."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _spans.append((name, start, time.perf_counter_ns() - start, threading.get_ident(), None))
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def counters():
+    """Returns a copy of the counters."""
+    with _lock:
+        return dict(_counters)
+
+
+def spans():
+    """Returns a copy of the ring buffer, oldest first."""
+    return list(_spans)
+
+
+def clear():
+    _spans.clear()
+    with _lock:
+        _counters.clear()
+
+
+def summary():
+    """
+    Returns [(name, calls, total_ms, mean_ms, max_ms)] for the spans in the
+    buffer, slowest total first.
+    """
+    stages = {}
+    for name, _, duration, _, _ in spans():
+        calls, total, longest = stages.get(name, (0, 0, 0))
+        stages[name] = (calls + 1, total + duration, max(longest, duration))
+    rows = [(name, calls, total / 1e6, total / calls / 1e6, longest / 1e6)
+            for name, (calls, total, longest) in stages.items()]
+    return sorted(rows, key=lambda row: -row[2])
+
+
+def dump_chrome_trace(path):
+    """Writes the buffered spans and current counters as a Chrome trace JSON file."""
+    pid = os.getpid()
+    events = []
+    for name, start, duration, tid, args in spans():
+        event = {"name": name, "cat": name.split(".")[0], "ph": "X", "pid": pid, "tid": tid,
+                 "ts": (start - _T0_NS) / 1000, "dur": duration / 1000}
+        if args:
+            event["args"] = {key: value if isinstance(value, (int, float, str, bool)) else repr(value)
+                             for key, value in args.items()}
+        events.append(event)
+    ts = (now_ns() - _T0_NS) / 1000
+    for name, value in counters().items():
+        events.append({"name": name, "ph": "C", "pid": pid, "ts": ts, "args": {"value": value}})
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fh)
+
+
+# --- Opt-in cProfile capture ---
+
+class ProfileCapture:
+    """
+    Profiles one run spread over several threads.  Each thread wraps its part
+    in `with capture.thread():`; save() merges the per-thread profiles.
+    The parts must not overlap in time (Python 3.12+ allows one active
+    profiler per process).
+    """
+
+    def __init__(self):
+        self._profiles = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def thread(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def save(self, path):
+        """Writes the merged profile (readable with pstats or snakeviz) to path."""
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
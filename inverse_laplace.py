@@ -0,0 +1,215 @@
+"""
+Numerical inverse Laplace transform of Eq (28), independent of the series.
+
+    theta~(y,s) = (1/s) exp(-y sqrt(Pr s^(1-β) / (k1/s + ko)))
+
+is inverted with the fixed Talbot contour (Abate & Valkó, 2004).  For time t
+the M contour nodes are s_k = c_k / t with constants c_k shared by every point,
+so sqrt(Pr s^(1-β) / (k1/s + ko)) is evaluated once per (t, node) and reused
+for every y.  It stays fast exactly where the Eq (30) series struggles
+(t -> 0, β close to 1, large t) and doubles as an independent cross-check.
+
+The contour assumes every singularity of theta~ is at Re(s) <= 0.  With
+k1 < 0, k1/s + ko vanishes at s = -k1/ko > 0, a branch point the contour
+does not enclose, so negative k1 is rejected rather than inverted wrongly.
+For k1 > 0 that point lies on the negative axis; theta~ grows without bound
+next to it, so where the contour comes close (large k1 t/ko) the sum is
+checked against finer rules (see theta_talbot).
+"""
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from instrument import count, timed
+from series import _check_parameters, theta_adaptive
+
+
+# Nodes on the contour; ~M/2 digits are achievable in double precision only
+# up to M of about 30, beyond which round-off dominates
+DEFAULT_NODES = 24
+
+# Points evaluated per batch (bounds the (points x nodes) complex work arrays)
+BATCH_SIZE = 65536
+
+# k1 t/ko above which a point is re-evaluated with the finer rules, and the
+# agreement between consecutive rules that is accepted
+REFINE_K1T = 10.0
+REFINED_NODES = (32, 48, 64, 80)
+REFINE_TOLERANCE = 1e-9
+
+CrossCheck = namedtuple("CrossCheck", ["max_difference", "compared", "max_series_error"])
+
+# (y, t, Pr, β, k1, ko) checked by reference_check: large t and small β, where
+# the contour nodes come closest to the branch cut and the series cannot be used,
+# including the corner of the plot tab's slider ranges
+REFERENCE_POINTS = (
+    (1.0, 20.0, 0.71, 0.0, 2.5, 1.0),
+    (1.0, 20.0, 0.71, 0.1, 2.5, 1.0),
+    (1.0, 20.0, 0.71, 0.2, 2.5, 1.0),
+    (0.5, 5.0, 10.0, 0.0, 5.0, 0.2),
+    (0.25, 5.0, 0.05, 0.0, 5.0, 0.2),
+    (1.0, 2.0, 0.71, 0.5, 2.5, 1.0),
+    (3.0, 3.46, 10.0, 0.0, 5.0, 0.2),
+    (8.0, 1.0, 1.0, 0.0, 64.0, 1.0),
+)
+REFERENCE_TOLERANCE = 1e-10
+
+
+def talbot_nodes(n_nodes=DEFAULT_NODES):
+    """
+    Returns the fixed Talbot constants (c, w): for time t the nodes are c / t and
+    f(t) ~= sum(Re(w * exp(c) * F(c / t))) / t.  The k = 0 weight includes the 1/2.
+    """
+    k = np.arange(1, n_nodes)
+    angle = k * np.pi / n_nodes
+    cot = 1.0 / np.tan(angle)
+    r = 2.0 * n_nodes / 5.0
+    c = np.concatenate([[r + 0j], r * angle * (cot + 1j)])
+    sigma = angle + (angle * cot - 1.0) * cot
+    w = np.concatenate([[0.5 + 0j], 1.0 + 1j * sigma]) * (r / n_nodes)
+    return c, w
+
+
+def _exponent(s, pr, beta, k1, k0):
+    """
+    sqrt(Pr s^(1-β) / (k1/s + ko)) continued from the positive real axis.
+    The root is taken factor by factor: on nodes near the negative real axis
+    with |s| < k1/ko the argument of the whole quotient passes π, and its
+    principal root would jump to the other branch.
+    """
+    return np.sqrt(pr) * s ** ((1.0 - beta) / 2) / np.sqrt(k1 / s + k0)
+
+
+def _check_contour(pr, beta, k1, k0):
+    _check_parameters(pr, beta, k0)
+    if k1 < 0:
+        raise ValueError("The Talbot inversion needs k1 >= 0 (k1 < 0 puts a branch point "
+                         "at s = -k1/ko > 0, outside the contour); use the series instead")
+
+
+def _talbot_sum(y, t, pr, beta, k1, k0, n_nodes):
+    """The n_nodes-point Talbot sum at the points of the flat arrays y and t (t > 0)."""
+    t_values, t_index = np.unique(t, return_inverse=True)
+    c, w = talbot_nodes(n_nodes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s = c[None, :] / t_values[:, None]
+        g = _exponent(s, pr, beta, k1, k0)
+        # w e^{c} F(s) / t with F(s) = exp(-y g) / s, minus the y-dependent factor
+        base = w[None, :] * np.exp(c)[None, :] / (s * t_values[:, None])
+
+    values = np.empty(y.size)
+    for start in range(0, y.size, BATCH_SIZE):
+        stop = start + BATCH_SIZE
+        ti = t_index[start:stop]
+        terms = base[ti] * np.exp(-y[start:stop, None] * g[ti])
+        values[start:stop] = np.sum(terms.real, axis=-1)
+    return values
+
+
+@timed("theta.talbot")
+def theta_talbot(y, t, pr, beta, k1, k0, n_nodes=DEFAULT_NODES, with_error=False):
+    """
+    Evaluates theta(y,t) by inverting Eq (28) numerically, point by point.
+    y and t are broadcast against each other; t must be positive.
+    Raises ValueError for invalid parameters, including k1 < 0.
+
+    Where k1 t/ko > REFINE_K1T the contour passes near s = -k1/ko, around which
+    theta~ grows like exp(y / sqrt(s + k1/ko)); there the rules in REFINED_NODES
+    are tried in turn until two consecutive ones agree to REFINE_TOLERANCE.
+    Points where none do are NaN.  With with_error, also returns that
+    difference as an error estimate (0 where no refinement was needed).
+    """
+    _check_contour(pr, beta, k1, k0)
+    y, t = np.broadcast_arrays(np.asarray(y, dtype=float), np.asarray(t, dtype=float))
+    shape = y.shape
+    y_flat, t_flat = y.ravel(), t.ravel()
+    valid = t_flat > 0
+    count("theta.talbot_points", y_flat.size)
+
+    values = np.full(y_flat.size, np.nan)
+    errors = np.zeros(y_flat.size)
+    values[valid] = _talbot_sum(y_flat[valid], t_flat[valid], pr, beta, k1, k0, n_nodes)
+
+    pending = np.nonzero(valid & (k1 * t_flat / k0 > REFINE_K1T))[0]
+    for finer in (n for n in REFINED_NODES if n > n_nodes):
+        if pending.size == 0:
+            break
+        count("theta.talbot_refined", pending.size)
+        refined = _talbot_sum(y_flat[pending], t_flat[pending], pr, beta, k1, k0, finer)
+        with np.errstate(invalid="ignore"):
+            errors[pending] = np.abs(refined - values[pending])
+        values[pending] = refined
+        pending = pending[~(errors[pending] <= REFINE_TOLERANCE)]
+    values[pending] = np.nan
+    errors[pending] = np.where(np.isnan(errors[pending]), np.inf, errors[pending])
+
+    if with_error:
+        return values.reshape(shape), errors.reshape(shape)
+    return values.reshape(shape)
+
+
+def theta_talbot_grid(y, t, pr, beta, k1, k0, n_nodes=DEFAULT_NODES):
+    """
+    Evaluates theta(y,t) on the outer grid of 1-D arrays y and t.
+    Returns an array of shape (len(y), len(t)).
+    """
+    y = np.atleast_1d(np.asarray(y, dtype=float))
+    t = np.atleast_1d(np.asarray(t, dtype=float))
+    return theta_talbot(y[:, None], t[None, :], pr, beta, k1, k0, n_nodes)
+
+
+def cross_check(y, t, pr, beta, k1, k0, n_nodes=DEFAULT_NODES, tol=1e-10):
+    """
+    Compares the Talbot inversion with the adaptive Eq (30) series.
+    Only points where the series' own error estimate is below 1e-6 are compared,
+    so large t with small β is not covered; see reference_check.
+    Returns CrossCheck(max_difference, compared, max_series_error).
+    """
+    talbot = theta_talbot(y, t, pr, beta, k1, k0, n_nodes)
+    series = theta_adaptive(y, t, pr, beta, k1, k0, tol=tol)
+    trusted = np.isfinite(talbot) & (series.error < 1e-6)
+    if not trusted.any():
+        return CrossCheck(np.nan, 0, np.nan)
+    difference = np.abs(talbot[trusted] - series.value[trusted])
+    return CrossCheck(float(difference.max()), int(trusted.sum()),
+                      float(series.error[trusted].max()))
+
+
+def reference_check(points=REFERENCE_POINTS, n_nodes=DEFAULT_NODES, dps=30):
+    """
+    Compares the Talbot inversion with mpmath's de Hoog inversion at dps digits
+    for each (y, t, Pr, β, k1, ko) in points; unlike cross_check this covers
+    the regimes where the series has not converged.  Needs mpmath (ImportError
+    otherwise).  Returns [(point, talbot, reference)].
+    """
+    import mpmath
+
+    rows = []
+    with mpmath.workdps(dps):
+        for y, t, pr, beta, k1, k0 in points:
+            def transform(s):
+                return mpmath.exp(-y * mpmath.sqrt(pr) * s ** ((1 - mpmath.mpf(beta)) / 2)
+                                  / mpmath.sqrt(k1 / s + k0)) / s
+            reference = float(mpmath.invertlaplace(transform, t, method="dehoog"))
+            rows.append(((y, t, pr, beta, k1, k0), float(theta_talbot(y, t, pr, beta, k1, k0, n_nodes)),
+                         reference))
+    return rows
+
+
+if __name__ == "__main__":
+    # python inverse_laplace.py: checks the inversion against the mpmath reference
+    try:
+        rows = reference_check()
+    except ImportError as e:
+        print(f"Error: the reference check needs mpmath ({e})")
+        sys.exit(1)
+    worst = 0.0
+    for point, talbot, reference in rows:
+        worst = max(worst, abs(talbot - reference))
+        print(f"y={point[0]:g} t={point[1]:g} Pr={point[2]:g} β={point[3]:g} k1={point[4]:g} ko={point[5]:g}: "
+              f"talbot {talbot:.15f}  reference {reference:.15f}  difference {abs(talbot - reference):.2e}")
+    if worst > REFERENCE_TOLERANCE:
+        print(f"Warning: the Talbot inversion is off by up to {worst:.2e}")
+        sys.exit(1)
+    print(f"Talbot inversion within {REFERENCE_TOLERANCE:g} of the reference")
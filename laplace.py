@@ -1,72 +1,46 @@
+import time
+STARTUP_T0 = time.perf_counter()
+
 import customtkinter as ctk
 import sys
 import os
-import matplotlib.pyplot as plt
-from PIL import Image
+import multiprocessing
+import queue
+import threading
+from contextlib import nullcontext
 from customtkinter import filedialog
-import time
 
-# --- NEW: PDF Generation Imports ---
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image as ReportLabImage
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.lib.units import inch
-except ImportError:
-    # --- FIX: Corrected print statements (fixes Pylance Error 1) ---
-    print("--------------------" * 3)
-    print("ERROR: 'reportlab' library not found.")
-    print("Please install it by running: pip install reportlab")
-    print("--------------------" * 3)
-    sys.exit(1)
+from derivation import CONSTANT_VALUES, get_derivation_content, steps_to_update
+from instrument import ProfileCapture, span
+
+# --- Staged startup ---
+# Only customtkinter and the (plain-Python) derivation text are imported before
+# the window appears.  The matplotlib renderer is loaded on a background thread
+# once the window is up, and ReportLab only when "Download PDF" is clicked.
+# Set LAPLACE_STARTUP_TIMING=1 to print when each stage finishes;
+# startup_profile.py breaks the import cost down per module.
+STARTUP_TIMING = os.environ.get("LAPLACE_STARTUP_TIMING") == "1"
+
+
+def startup_mark(stage):
+    """Prints the time since process start for a startup stage (if enabled)."""
+    if STARTUP_TIMING:
+        print(f"[startup] {stage}: {(time.perf_counter() - STARTUP_T0) * 1000:.0f} ms")
+
+
+startup_mark("GUI imports done")
 
 
 # --- Set the appearance (Dark/Light/System) ---
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
-# --- Matplotlib (LaTeX) Renderer ---
-
-# Configure matplotlib to use a dark background for our app
-plt.rcParams.update({
-    'text.color': 'white',
-    'figure.facecolor': '#2b2b2b',  # Matches CustomTkinter's dark 'frame'
-    'savefig.facecolor': '#2b2b2b', # Matches CustomTkinter's dark 'frame'
-    'savefig.edgecolor': '#2b2b2b',
-    'savefig.transparent': False,
-})
-
-def create_math_image(latex_str, img_name, font_size=16):
-    """
-    Renders a LaTeX string into a PNG image using matplotlib's mathtext.
-    Returns the path to the created image.
-    """
-    try:
-        # Add $...$ for mathtext
-        full_latex_str = f"${latex_str}$"
-        
-        fig = plt.figure()
-        # Add text to the figure
-        fig.text(0.5, 0.5, full_latex_str,
-                 horizontalalignment='center',
-                 verticalalignment='center',
-                 fontsize=font_size)
-        
-        # Save the figure, cropping to the text
-        # Use a timestamp to ensure unique filenames
-        unique_img_name = f"{img_name}_{time.time_ns()}.png"
-        img_path = f"./{unique_img_name}"
-
-        plt.savefig(img_path,
-                    bbox_inches='tight',   # Crop whitespace
-                    pad_inches=0.1,        # Add slight padding
-                    dpi=300)               # High resolution
-        plt.close(fig) # Close the figure to free memory
-        return img_path
-    
-    except Exception as e:
-        print(f"Error rendering LaTeX: {e}")
-        return None
+# How often (ms) the Tk loop picks up results from background workers
+RESULT_POLL_MS = 30
+
+# Widest an equation is shown, in (unscaled) pixels:
+# 800 (app) - 40 (frame pad) - 40 (img pad) - 20 (scrollbar) = 700
+EQUATION_MAX_WIDTH = 700
 
 # --- Main Application ---
 
@@ -80,10 +54,24 @@ class App(ctk.CTk):
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(3, weight=1)
 
-        # Store image references to prevent garbage collection
-        self.image_references = []
-        # --- Store temp image paths for cleanup ---
-        self.temp_image_files = [] 
+        # Store image references (by step) to prevent garbage collection
+        self.image_references = {}
+
+        # --- Background work: finished steps are posted here and picked up on the Tk loop ---
+        self.results_queue = queue.Queue()
+        self.job_id = 0
+        self.cancel_event = None
+        self.plot_panel = None
+        self.diagnostics_panel = None
+
+        # --- Widgets of the displayed derivation, kept between runs ---
+        self.step_widgets = []
+        self.pending_steps = set()
+        self.current_values = None
+        self.render_scaling = 1.0
+        self.pdf_button = None
+        self.export_button = None
+        self.pdf_status_label = None
 
         # --- 1. Title Label ---
         self.title_label = ctk.CTkLabel(self, text="Dr Syed Tauseef's Derivation Helper",
@@ -97,11 +85,11 @@ class App(ctk.CTk):
 
         self.entries = {}
         # --- FIX: Use proper 'β' symbol in labels and constant values ---
-        self.entries["Pr"] = self.create_input_row("Pr:", 0, "Pr", "0.71", "Enter Value")
-        self.entries["y"] = self.create_input_row("y:", 1, "y", "", "Keep Constant")
-        self.entries["beta"] = self.create_input_row("β:", 2, "β", "", "Keep Constant")
-        self.entries["k1"] = self.create_input_row("k1(β):", 3, "k_1(β)", "2.5", "Enter Value")
-        self.entries["k0"] = self.create_input_row("ko(β):", 4, "k_o(β)", "", "Keep Constant")
+        self.entries["Pr"] = self.create_input_row("Pr:", 0, CONSTANT_VALUES["pr"], "0.71", "Enter Value")
+        self.entries["y"] = self.create_input_row("y:", 1, CONSTANT_VALUES["y"], "", "Keep Constant")
+        self.entries["beta"] = self.create_input_row("β:", 2, CONSTANT_VALUES["beta"], "", "Keep Constant")
+        self.entries["k1"] = self.create_input_row("k1(β):", 3, CONSTANT_VALUES["k1"], "2.5", "Enter Value")
+        self.entries["k0"] = self.create_input_row("ko(β):", 4, CONSTANT_VALUES["k0"], "", "Keep Constant")
 
         # --- 3. Execute Button ---
         self.execute_button = ctk.CTkButton(self, text="Execute Derivation",
@@ -109,10 +97,21 @@ class App(ctk.CTk):
                                             command=self.run_derivation)
         self.execute_button.grid(row=2, column=0, padx=20, pady=20)
 
-        # --- 4. Output Scrollable Frame ---
-        self.output_frame = ctk.CTkScrollableFrame(self, label_text="Derivation Steps", 
+        self.diagnostics_switch = ctk.CTkSwitch(self, text="Diagnostics", command=self.toggle_diagnostics)
+        self.diagnostics_switch.grid(row=2, column=0, padx=20, pady=20, sticky="e")
+
+        # --- 4. Output Tabs: derivation steps and the θ(y,t) plot ---
+        self.tabs = ctk.CTkTabview(self, command=self.on_tab_change)
+        self.tabs.grid(row=3, column=0, padx=20, pady=(0, 0), sticky="nsew")
+        steps_tab = self.tabs.add("Derivation Steps")
+        self.plot_tab = self.tabs.add("θ(y,t) Plot")
+        for tab in (steps_tab, self.plot_tab):
+            tab.grid_columnconfigure(0, weight=1)
+            tab.grid_rowconfigure(0, weight=1)
+
+        self.output_frame = ctk.CTkScrollableFrame(steps_tab, label_text="Derivation Steps", 
                                                    label_font=ctk.CTkFont(size=14, weight="bold"))
-        self.output_frame.grid(row=3, column=0, padx=20, pady=(10, 0), sticky="nsew")
+        self.output_frame.grid(row=0, column=0, sticky="nsew")
         self.output_frame.grid_columnconfigure(0, weight=1)
 
         self.placeholder_label = ctk.CTkLabel(self.output_frame, 
@@ -125,25 +124,52 @@ class App(ctk.CTk):
         self.footer_label = ctk.CTkLabel(self, text="Licensed and author Dr Syed Tauseef",
                                          font=ctk.CTkFont(size=12))
         self.footer_label.grid(row=4, column=0, padx=20, pady=(10, 20))
-        
-        # --- NEW: Bind window close event to cleanup temp files ---
-        self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
-    def on_closing(self):
-        """Cleanup temp image files before closing the window."""
-        self.cleanup_temp_files()
-        self.destroy()
+        self.after(RESULT_POLL_MS, self.poll_results)
+        startup_mark("window built")
+        # Runs once the main loop is up and the window has been drawn
+        self.after(0, self.start_background_loading)
 
-    def cleanup_temp_files(self):
-        """Iterates and deletes all temporary image files."""
-        for img_file in self.temp_image_files:
-            try:
-                if os.path.exists(img_file):
-                    os.remove(img_file)
-            except Exception as e:
-                print(f"Warning: could not delete temp file {img_file}. Error: {e}")
-        self.temp_image_files.clear()
+    def start_background_loading(self):
+        """Loads the heavy renderer off the Tk thread so the first Execute doesn't wait for it."""
+        startup_mark("window shown")
+
+        def load_renderer():
+            import mathrender  # matplotlib, NumPy and PIL
+            startup_mark("renderer loaded")
 
+        threading.Thread(target=load_renderer, daemon=True).start()
+
+    def on_tab_change(self):
+        """Builds the plot panel the first time its tab is opened (keeps matplotlib off the startup path)."""
+        if self.tabs.get() != "θ(y,t) Plot" or self.plot_panel is not None:
+            return
+        from plot_panel import ThetaPlotPanel
+
+        # Start the sliders at whatever numeric values are entered
+        initial_values = {}
+        for key, name in (("beta", "beta"), ("pr", "Pr"), ("k1", "k1"), ("k0", "k0")):
+            try:
+                initial_values[key] = float(self.entries[name].get())
+            except ValueError:
+                pass
+        self.plot_panel = ThetaPlotPanel(self.plot_tab, initial_values, fg_color="transparent")
+        self.plot_panel.grid(row=0, column=0, sticky="nsew")
+
+    def toggle_diagnostics(self):
+        """Shows or hides the Diagnostics tab (built the first time it is shown)."""
+        if self.diagnostics_switch.get():
+            from diagnostics_panel import DiagnosticsPanel
+
+            tab = self.tabs.add("Diagnostics")
+            tab.grid_columnconfigure(0, weight=1)
+            tab.grid_rowconfigure(0, weight=1)
+            self.diagnostics_panel = DiagnosticsPanel(tab, fg_color="transparent")
+            self.diagnostics_panel.grid(row=0, column=0, sticky="nsew")
+            self.tabs.set("Diagnostics")
+        else:
+            self.tabs.delete("Diagnostics")
+            self.diagnostics_panel = None
 
     def create_input_row(self, label_text, row, const_val, entry_val, default_mode):
         label = ctk.CTkLabel(self.input_frame, text=label_text, 
@@ -180,14 +206,38 @@ class App(ctk.CTk):
             entry_widget.delete(0, "end")
 
     def run_derivation(self):
-        # 1. Clear old results
-        for widget in self.output_frame.winfo_children():
-            widget.destroy()
-        
-        # --- Clean up old temp images ---
-        self.cleanup_temp_files()
-        
-        self.image_references.clear() # Clear old images
+        # With "Profile next Execute" ticked, this run (here and in the render
+        # thread, one after the other) is captured with cProfile
+        capture = None
+        if self.diagnostics_panel is not None and self.diagnostics_panel.take_profile_request():
+            capture = ProfileCapture()
+
+        with span("derivation.run"), (capture.thread() if capture else nullcontext()):
+            equations, equation_steps = self.update_derivation()
+
+        # 6. Render the changed equations off the Tk thread, at the pixel density
+        #    the labels are drawn with (screen DPI x the user's scaling)
+        self.pending_steps = set(equation_steps)
+        self.render_scaling = ctk.ScalingTracker.get_widget_scaling(self.output_frame)
+        args = (self.job_id, equations, equation_steps, self.render_scaling, self.cancel_event)
+        if capture is not None:
+            worker = threading.Thread(target=self.profiled, args=(capture, self.derivation_worker) + args,
+                                      daemon=True)
+            worker.start()
+        elif equations:
+            worker = threading.Thread(target=self.derivation_worker, args=args, daemon=True)
+            worker.start()
+
+    def update_derivation(self):
+        """
+        Steps 1-5 of run_derivation: rebuilds the content and the text widgets
+        that changed.  Returns the (equations, steps) still to be rendered.
+        """
+        # 1. Cancel any derivation still rendering
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.job_id += 1
+        self.cancel_event = threading.Event()
 
         # 2. Get all values
         # We use repr() to get a string '0.71' or "'Pr'"
@@ -197,76 +247,180 @@ class App(ctk.CTk):
         beta = self.entries["beta"].get().strip("'\"")
         k1 = self.entries["k1"].get().strip("'\"")
         k0 = self.entries["k0"].get().strip("'\"")
-
-        # --- Store values for PDF function ---
-        self.current_values = {"pr": pr, "y": y, "beta": beta, "k1": k1, "k0": k0}
-
-        # 3. Generate derivation content (list of dicts)
-        derivation_content = self.get_derivation_content(pr, y, beta, k1, k0)
-        # --- Store content for PDF function ---
+        values = {"pr": pr, "y": y, "beta": beta, "k1": k1, "k0": k0}
+
+        # 3. Generate derivation content (list of dicts) and find the steps
+        #    whose inputs changed since the last run; the rest keep their widgets
+        with span("derivation.content"):
+            derivation_content = get_derivation_content(pr, y, beta, k1, k0)
+        if len(self.step_widgets) == len(derivation_content):
+            # Steps a cancelled run never finished are redone as well
+            stale = steps_to_update(derivation_content, self.current_values, values) | self.pending_steps
+        else:
+            stale = set(range(len(derivation_content)))
+            for widget in self.output_frame.winfo_children():
+                widget.destroy()
+            self.step_widgets = [None] * len(derivation_content)
+            self.image_references.clear() # Clear old images
+            self.pdf_button = None
+            self.export_button = None
+
+        # --- Store values and content for PDF function ---
+        self.current_values = values
         self.current_derivation_content = derivation_content
 
-        # --- 4. Add "Download PDF" button to the results frame ---
-        self.pdf_button = ctk.CTkButton(self.output_frame, 
-                                        text="Download PDF of Results",
-                                        font=ctk.CTkFont(size=14, weight="bold"),
-                                        command=self.download_pdf)
-        self.pdf_button.grid(row=0, column=0, padx=10, pady=(10, 20), sticky="w")
-
-
-        # 5. Add content to the scrollable frame
-        row_counter = 1 # Start at row 1 (PDF button is at row 0)
-        for item in derivation_content:
+        # --- 4. "Download PDF" and "Export θ Grid" buttons at the top of the results frame ---
+        if self.pdf_status_label is not None:
+            self.pdf_status_label.destroy()
+            self.pdf_status_label = None
+        if self.pdf_button is None:
+            self.pdf_button = ctk.CTkButton(self.output_frame, 
+                                            text="Download PDF of Results",
+                                            font=ctk.CTkFont(size=14, weight="bold"),
+                                            command=self.download_pdf)
+            self.export_button = ctk.CTkButton(self.output_frame,
+                                               text="Export θ Grid",
+                                               font=ctk.CTkFont(size=14, weight="bold"),
+                                               command=self.download_grid)
+        self.show_export_buttons()
+
+        # 5. Add text now; equations keep their old image until the new one
+        #    is filled in by poll_results as it finishes rendering
+        equations = []
+        equation_steps = []
+        for index, item in enumerate(derivation_content):
+            if index not in stale and self.step_widgets[index] is not None:
+                continue
+            row = index + 1 # Start at row 1 (PDF button is at row 0)
             if item["type"] == "text":
                 font_size = item.get("size", 14)
                 font_weight = item.get("weight", "normal")
                 justify = item.get("justify", "left")
                 pady = item.get("pady", (0, 10))
 
-                label = ctk.CTkLabel(self.output_frame,
-                                     text=item['content'],
-                                     font=ctk.CTkFont(size=font_size, weight=font_weight),
-                                     justify=justify,
-                                     anchor="w")
-                label.grid(row=row_counter, column=0, padx=10, pady=pady, sticky="w")
-                row_counter += 1
+                with span("gui.text_widget"):
+                    if self.step_widgets[index] is not None:
+                        self.step_widgets[index].destroy()
+                    label = ctk.CTkLabel(self.output_frame,
+                                         text=item['content'],
+                                         font=ctk.CTkFont(size=font_size, weight=font_weight),
+                                         justify=justify,
+                                         anchor="w")
+                    label.grid(row=row, column=0, padx=10, pady=pady, sticky="w")
+                    self.step_widgets[index] = label
             
             elif item["type"] == "latex":
-                # Render the LaTeX string to an image file
-                img_path = create_math_image(item["content"], f"temp_img_{row_counter}", item.get("size", 16))
-                
-                if img_path:
-                    # --- Store temp file path for cleanup ---
-                    self.temp_image_files.append(img_path)
-
-                    # Open the image with PIL
-                    pil_image = Image.open(img_path)
-                    
-                    # --- FIX: Resize image if it's too wide ---
-                    # 800 (app) - 40 (frame pad) - 40 (img pad) - 20 (scrollbar) = 700
-                    max_width = 700 
-                    original_width, original_height = pil_image.size
-                    
-                    if original_width > max_width:
-                        # Calculate new height to maintain aspect ratio
-                        aspect_ratio = original_height / original_width
-                        new_height = int(max_width * aspect_ratio)
-                        new_size = (max_width, new_height)
-                    else:
-                        new_size = pil_image.size
-                    # --- End of FIX ---
-
-                    # Create a CTkImage with the (potentially) new size
-                    ctk_image = ctk.CTkImage(light_image=pil_image, size=new_size)
-                    
-                    # Store reference
-                    self.image_references.append(ctk_image)
-
-                    # Create a label to display the image
-                    img_label = ctk.CTkLabel(self.output_frame, image=ctk_image, text="")
-                    img_label.grid(row=row_counter, column=0, padx=20, pady=10, sticky="w")
-                    row_counter += 1
-                    
+                equation_steps.append(index)
+                equations.append((item["content"], item.get("size", 16)))
+        return equations, equation_steps
+
+    def profiled(self, capture, target, *args):
+        """Background thread: runs target under a profile capture, then hands the capture to the Tk loop."""
+        try:
+            with capture.thread():
+                target(*args)
+        finally:
+            self.results_queue.put((None, "profile_done", capture))
+
+    def derivation_worker(self, job_id, equations, equation_steps, scaling, cancel_event):
+        """Background thread: renders and decodes each equation, posting it as soon as it is ready."""
+        from PIL import Image
+        from mathrender import DEFAULT_DPI, iter_render
+
+        # Equations keep their 300-dpi on-screen size, capped at EQUATION_MAX_WIDTH,
+        # but are rendered with exactly the pixels the scaled label shows
+        for index, img_buffer in iter_render(equations, dpi=DEFAULT_DPI * scaling,
+                                             cancel_event=cancel_event,
+                                             max_width=EQUATION_MAX_WIDTH * scaling):
+            if cancel_event.is_set():
+                return
+            pil_image = None
+            if img_buffer:
+                with span("render.decode"):
+                    pil_image = Image.open(img_buffer)
+                    pil_image.load() # Decode here rather than on the Tk thread
+            self.results_queue.put((job_id, "step", (equation_steps[index], pil_image)))
+
+    def poll_results(self):
+        """Runs on the Tk loop: places finished steps and PDF/export results posted by the workers."""
+        try:
+            while True:
+                job_id, kind, payload = self.results_queue.get_nowait()
+                if kind == "step" and job_id == self.job_id:
+                    self.show_equation(*payload)
+                elif kind == "pdf_saved":
+                    self.show_pdf_status(f"✔ Successfully saved to:\n{payload}", "green", bold=True)
+                elif kind == "pdf_error":
+                    print(f"Error creating PDF: {payload}")
+                    self.show_pdf_status(f"Error creating PDF: {payload}", "red")
+                elif kind == "export_error":
+                    print(f"Error exporting grid: {payload}")
+                    self.show_pdf_status(f"Error exporting grid: {payload}", "red")
+                elif kind == "profile_done" and self.diagnostics_panel is not None:
+                    self.diagnostics_panel.save_profile(payload)
+        except queue.Empty:
+            pass
+        self.after(RESULT_POLL_MS, self.poll_results)
+
+    def show_equation(self, step, pil_image):
+        """Shows one rendered equation in its step's row, reusing the label if it has one."""
+        if pil_image is None:
+            return
+        with span("gui.equation_widget"):
+            self.place_equation(step, pil_image)
+
+    def place_equation(self, step, pil_image):
+        self.pending_steps.discard(step)
+
+        # The image was rendered for the current scaling (and already fits
+        # EQUATION_MAX_WIDTH), so CTkImage's own rescale is one-to-one
+        scaling = self.render_scaling
+        new_size = (max(1, round(pil_image.width / scaling)), max(1, round(pil_image.height / scaling)))
+
+        # Create a CTkImage at its unscaled display size
+        ctk_image = ctk.CTkImage(light_image=pil_image, size=new_size)
+        
+        # Store reference (replacing the step's previous image)
+        self.image_references[step] = ctk_image
+
+        img_label = self.step_widgets[step]
+        if img_label is None:
+            # Create a label to display the image
+            img_label = ctk.CTkLabel(self.output_frame, image=ctk_image, text="")
+            img_label.grid(row=step + 1, column=0, padx=20, pady=10, sticky="w")
+            self.step_widgets[step] = img_label
+        else:
+            img_label.configure(image=ctk_image)
+
+    def show_export_buttons(self):
+        self.pdf_button.grid(row=0, column=0, padx=10, pady=(10, 20), sticky="w")
+        self.export_button.grid(row=0, column=0, padx=10, pady=(10, 20), sticky="e")
+
+    def show_pdf_status(self, message, color, bold=False):
+        """Shows the result of a PDF or grid export in place of the download buttons."""
+        if self.pdf_status_label is not None:
+            self.pdf_status_label.destroy()
+        font = ctk.CTkFont(size=14, weight="bold") if bold else None
+        status_label = ctk.CTkLabel(self.output_frame, text=message, font=font,
+                                    text_color=color, anchor="w", justify="left")
+        status_label.grid(row=0, column=0, padx=10, pady=(10, 20), sticky="w")
+        self.pdf_status_label = status_label
+        if bold:
+            # Overwrite the buttons
+            if self.pdf_button is not None:
+                self.pdf_button.grid_forget()
+                self.export_button.grid_forget()
+            
+            # Make the "Saved!" message disappear after 5 seconds
+            status_label.after(5000, lambda: self.clear_pdf_status(status_label))
+
+    def clear_pdf_status(self, status_label):
+        """Removes a status message and brings the download buttons back."""
+        if self.pdf_status_label is status_label:
+            status_label.destroy()
+            self.pdf_status_label = None
+            if self.pdf_button is not None:
+                self.show_export_buttons()
 
     # --- Function to handle PDF Download ---
     def download_pdf(self):
@@ -281,288 +435,83 @@ class App(ctk.CTk):
         if not filename:
             return # User cancelled
             
-        # 2. Get inputs and derivation content
-        values = self.current_values
-        derivation_content = self.current_derivation_content
-        
-        # 3. Create PDF
-        doc = SimpleDocTemplate(filename, pagesize=letter,
-                                rightMargin=inch, leftMargin=inch,
-                                topMargin=inch, bottomMargin=inch)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # 4. Add Title
-        story.append(Paragraph("Dr Syed Tauseef's Derivation Report", styles['h1']))
-        story.append(Spacer(1, 0.25 * inch))
-        
-        # 5. Add Inputs
-        story.append(Paragraph("Input Values", styles['h2']))
-        story.append(Paragraph(f"Pr: {values['pr']}", styles['Normal']))
-        story.append(Paragraph(f"y: {values['y']}", styles['Normal']))
-        story.append(Paragraph(f"β: {values['beta']}", styles['Normal']))
-        story.append(Paragraph(f"k1(β): {values['k1']}", styles['Normal']))
-        story.append(Paragraph(f"ko(β): {values['k0']}", styles['Normal']))
-        story.append(Spacer(1, 0.25 * inch))
-
-        # 6. Add Derivation Steps
-        story.append(Paragraph("Derivation Steps", styles['h2']))
-        
-        temp_pdf_images = []
+        # 2. Build the PDF off the Tk thread; the result is posted back to poll_results
+        worker = threading.Thread(target=self.pdf_worker,
+                                  args=(filename, self.current_values, self.current_derivation_content),
+                                  daemon=True)
+        worker.start()
+
+    def pdf_worker(self, filename, values, derivation_content):
+        """Background thread: builds the PDF (equations are drawn as vector outlines)."""
         try:
-            for item in derivation_content:
-                if item["type"] == "text":
-                    # Convert bold/size to simple style
-                    if item.get("weight") == "bold":
-                        style = styles['h3']
-                    else:
-                        style = styles['Normal']
-                    # Replace \n with <br/> for PDF paragraphs
-                    text_content = item['content'].replace('\n', '<br/>')
-                    story.append(Paragraph(text_content, style))
-                    story.append(Spacer(1, 0.1 * inch))
-                
-                elif item["type"] == "latex":
-                    # Create a new temp image just for the PDF
-                    img_path = create_math_image(item["content"], f"temp_pdf_img", item.get("size", 16))
-                    if img_path:
-                        temp_pdf_images.append(img_path)
-                        # Add image to PDF, scaling it to fit width
-                        rl_img = ReportLabImage(img_path, width=6.5 * inch, height=None)
-                        rl_img.drawHeight = rl_img.drawHeight * (6.5 * inch / rl_img.drawWidth) # Maintain aspect ratio
-                        rl_img.drawWidth = 6.5 * inch
-                        story.append(rl_img)
-                        story.append(Spacer(1, 0.1 * inch))
-            
-            # 7. Build the PDF
-            doc.build(story)
-
-            # 8. Show "Saved!" message in the app
-            saved_label = ctk.CTkLabel(self.output_frame,
-                                       text=f"✔ Successfully saved to:\n{filename}",
-                                       font=ctk.CTkFont(size=14, weight="bold"),
-                                       text_color="green", anchor="w", justify="left")
-            saved_label.grid(row=0, column=0, padx=10, pady=(10, 20), sticky="w")
-            # Overwrite the button
-            if hasattr(self, 'pdf_button'):
-                self.pdf_button.grid_forget()
-            
-            # Make the "Saved!" message disappear after 5 seconds
-            saved_label.after(5000, saved_label.destroy)
+            from report import build_pdf
+        except ImportError as e:
+            # --- FIX: Corrected print statements (fixes Pylance Error 1) ---
+            print("--------------------" * 3)
+            print(f"ERROR: {e.name!r} library not found.")
+            print("Please install it by running: pip install -r requirements.txt")
+            print("--------------------" * 3)
+            self.results_queue.put((None, "pdf_error", e))
+            return
+
+        try:
+            with span("pdf.build"):
+                build_pdf(filename, values, derivation_content)
+
+            # Show "Saved!" message in the app
+            self.results_queue.put((None, "pdf_saved", filename))
 
         except Exception as e:
-            print(f"Error creating PDF: {e}")
-            # Show error message
-            error_label = ctk.CTkLabel(self.output_frame,
-                                       text=f"Error creating PDF: {e}",
-                                       text_color="red", anchor="w", justify="left")
-            error_label.grid(row=0, column=0, padx=10, pady=(10, 20), sticky="w")
-        finally:
-            # 9. Clean up all temp PDF images
-            for img in temp_pdf_images:
-                try:
-                    if os.path.exists(img):
-                        os.remove(img)
-                except Exception as e:
-                    print(f"Warning: could not delete temp_pdf file {img}. Error: {e}")
+            self.results_queue.put((None, "pdf_error", e))
 
+    # --- Function to handle the θ grid export ---
+    def download_grid(self):
+        """Asks for a save location and exports θ(y,t) on a grid for the entered parameters."""
+        try:
+            parameters = [float(self.current_values[name]) for name in ("pr", "beta", "k1", "k0")]
+        except ValueError:
+            self.show_pdf_status("Exporting θ needs numeric Pr, β, k1(β) and ko(β).", "red")
+            return
 
-    def get_derivation_content(self, pr, y, beta, k1, k0):
-        """
-        Generates the derivation steps as a list of dicts.
-        Each dict has a 'type' ('text' or 'latex') and 'content'.
-        """
-        
-        # Helper to format values for LaTeX
-        def f(val):
-            try:
-                # If it's a number, just return it as a string
-                float(val)
-                return val
-            except ValueError:
-                # It's a string.
-                # Handle specific known constants
-                if val == "β":
-                    return r"\beta"
-                if val == "k_1(β)":
-                    return r"k_1(\beta)"
-                if val == "k_o(β)":
-                    return r"k_o(\beta)"
-                
-                # Handle general variables
-                if val.isalpha() and len(val) > 1:
-                    # e.g., "Pr" -> "\mathrm{Pr}"
-                    return fr"\mathrm{{{val}}}"
-                
-                # Default: return the value as is (e.g., "y")
-                return val
-
-        # --- Define formatted variables *once* for clarity ---
-        pr_val = f(pr)
-        y_val = f(y)
-        beta_val = f(beta)
-        k1_val = f(k1)
-        k0_val = f(k0)
-
-        parts = []
-
-        # --- Part 1: Eq (28) -> (29) ---
-        parts.append({
-            "type": "text", "content": f"Your specific Equation (28) is structured as:",
-            "size": 15, "weight": "bold", "pady": (5, 5)
-        })
-        parts.append({
-            "type": "latex",
-            # --- FIX: Corrected KeyError (k0_k0_val -> k0) ---
-            "content": r"\tilde{{\theta}}({y},s) = \frac{{1}}{{s}} \exp\left( -{y} \sqrt{{\frac{{ {pr} s^{{1-{beta}}} }}{{ {k1}/s + {k0} }} }} \right)".format(
-                y=y_val, pr=pr_val, beta=beta_val, k1=k1_val, k0=k0_val
-            ),
-            "size": 20 # Larger font for main equations
-        })
-        
-        # --- NEW: Add full Eq (29) ---
-        parts.append({
-            "type": "text", "content": "This is rearranged into the full series form (Eq 29):",
-            "size": 15, "weight": "bold", "pady": (10, 5)
-        })
-        parts.append({
-            "type": "latex",
-            # --- FIX: Denominator K!! -> K! l! ---
-            "content": r"\tilde{{\theta}}(y,s) = \frac{{1}}{{s}} + \sum_{{K=1}}^{{\infty}} \sum_{{l=0}}^{{\infty}} \left[ \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) s^{{1 - (1-{beta})K/2 + l}} }} \right]".format(
-                pr=pr_val, y=y_val, k1=k1_val, k0=k0_val, beta=beta_val
-            ),
-            "size": 20
-        })
-
-        # --- Part 2: Eq (29) -> (30) ---
-        parts.append({
-            "type": "text", "content": f"--- Step 2: Applying the Inverse Laplace Transform (Eq 30) ---",
-            "size": 16, "weight": "bold", "pady": (20, 10)
-        })
-        parts.append({
-            "type": "text", "content": "We apply the inverse Laplace transform (L⁻¹) to the general term inside the summation.\n"
-                                      "The key rule we need is:", "pady": (0, 5)
-        })
-        parts.append({
-            "type":"latex",
-            "content": r"\mathcal{{L}}^{{-1}} \left\{ \frac{{1}}{{s^v}} \right\} = \frac{{t^{{v-1}}}}{{\Gamma(v)}}",
-            "size": 18
-        })
-        parts.append({
-            "type": "text", "content": "1. First, we identify the 'Constant Part' [C]:",
-            "size": 15, "weight": "bold", "pady": (10, 5)
-        })
-        parts.append({
-            "type": "latex",
-            # --- FIX: Denominator K!! -> K! l! ---
-            "content": r"[C] = \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) }}".format(
-                pr=pr_val, y=y_val, k1=k1_val, k0=k0_val
-            ),
-            "size": 18
-        })
-        parts.append({
-            "type": "text", "content": "2. Next, we identify the 's-Part' and its exponent 'v':",
-            "size": 15, "weight": "bold", "pady": (10, 5)
-        })
-        parts.append({
-            "type": "latex",
-            "content": r"[s\text{{-Part}}] = \frac{{1}}{{s^{{1 - (1-{beta})K/2 + l}}}} \quad \Rightarrow \quad v = 1 - (1-{beta})K/2 + l".format(
-                beta=beta_val
-            ),
-            "size": 18
-        })
-        parts.append({
-            "type": "text", "content": "3. We apply the rule:",
-            "size": 15, "weight": "bold", "pady": (10, 5)
-        })
-        parts.append({
-            "type": "latex",
-            "content": r"v-1 = (1 - (1-{beta})K/2 + l) - 1 = l - (1-{beta})K/2".format(
-                beta=beta_val
-            ),
-            "size": 18
-        })
-        parts.append({
-            "type": "latex",
-            "content": r"\Gamma(v) = \Gamma(1 - (1-{beta})K/2 + l)".format(
-                beta=beta_val
-            ),
-            "size": 18
-        })
-        parts.append({
-            "type": "text", "content": "4. Re-assembling the term [C] * t^(v-1) / Γ(v):",
-            "size": 15, "weight": "bold", "pady": (10, 5)
-        })
-        parts.append({
-            "type": "latex",
-            # --- FIX 1: Denominator K!! -> K! l! ---
-            # --- FIX 2: Exponent t^(l + ...) -> t^(l - ...) ---
-            "content": r"\frac{{[C] \cdot t^{{v-1}}}}{{\Gamma(v)}} = \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) t^{{l - (1-{beta})K/2}} }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) \Gamma(1 - (1-{beta})K/2 + l) }}".format(
-                pr=pr_val, y=y_val, k1=k1_val, k0=k0_val, beta=beta_val
-            ),
-            "size": 20
-        })
-        
-        # --- NEW: Add the full Eq (30) ---
-        parts.append({
-            "type": "text", "content": "5. Finally, placing this back into the full solution (Eq 30):",
-            "size": 15, "weight": "bold", "pady": (10, 5)
-        })
-        parts.append({
-            "type": "latex",
-            # --- FIX 1: Denominator K!! -> K! l! ---
-            # --- FIX 2: Exponent t^(l + ...) -> t^(l - ...) ---
-            "content": r"\theta(y,t) = 1 + \sum_{{K=1}}^{{\infty}} \sum_{{l=0}}^{{\infty}} \left[ \frac{{ ({pr})^{{K/2}} (-{y})^K (-1)^l ({k1})^l \Gamma(K/2 + l) t^{{l - (1-{beta})K/2}} }}{{ K! l! ({k0})^{{K/2 + l}} \Gamma(K/2) \Gamma(1 - (1-{beta})K/2 + l) }} \right]".format(
-                pr=pr_val, y=y_val, k1=k1_val, k0=k0_val, beta=beta_val
-            ),
-            "size": 20
-        })
-
-        # --- NEW: Re-instated the note about the typo ---
-        parts.append({
-            "type": "text", "content": "--- NOTE ON MATH LOGIC (TYPO IN EQ 30) ---",
-            "size": 16, "weight": "bold", "pady": (20, 10)
-        })
-        parts.append({
-            # --- FIX: Pylance Error 2 (missing 'content' key) ---
-            "type": "text",
-            "content": "Our derivation for the exponent of 't' is (v-1) = l - (1-β)K/2. This follows the Laplace rule.\n"
-                        "The paper's original Eq (30) shows the exponent as: l + (1-β)K/2.\n\n"
-                        "This is a common type of sign-flip typo in complex academic papers.",
-            "justify": "left"
-        })
-        
-        # --- NEW: Add note about the k1=0, k0=1 case ---
-        parts.append({
-            "type": "text", "content": "--- Note on Simplified Case (for Graphing) ---",
-            "size": 16, "weight": "bold", "pady": (20, 10)
-        })
-        parts.append({
-            "type": "text",
-            "content": "You mentioned a simplified case for graphing where k1=0 and k0=1.\n"
-                       "If we apply this to Eq (28), the denominator (k1/s + k0) becomes 1.\n"
-                       "This simplifies the entire problem *before* the series expansion,\n"
-                       "leading to a different, simpler solution (not a double summation).",
-            "justify": "left"
-        })
-        
-        parts.append({
-            "type": "text", "content": "Derivation Complete!",
-            "size": 16, "weight": "bold", "pady": (20, 20), "justify": "center"
-        })
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".npz",
+            filetypes=[("Compressed NumPy", "*.npz"), ("NumPy Array (memory-mappable)", "*.npy"),
+                       ("CSV", "*.csv")],
+            title="Export θ(y,t) Grid"
+        )
+        if not filename:
+            return # User cancelled
 
-        return parts
+        worker = threading.Thread(target=self.export_worker, args=(filename, parameters), daemon=True)
+        worker.start()
+
+    def export_worker(self, filename, parameters):
+        """Background thread: evaluates and writes the grid (plus its .json sidecar) block by block."""
+        try:
+            import numpy as np
+            from export import DEFAULT_T_AXIS, DEFAULT_Y_AXIS, export_grid
+
+            y = np.linspace(*DEFAULT_Y_AXIS)
+            t = np.linspace(*DEFAULT_T_AXIS)
+            # Talbot, like the plot tab, wherever it applies (k1 >= 0)
+            method = "talbot" if parameters[2] >= 0 else "adaptive"
+            with span("export.grid"):
+                export_grid(filename, y, t, *parameters, method=method)
+            self.results_queue.put((None, "pdf_saved", filename))
+        except Exception as e:
+            self.results_queue.put((None, "export_error", e))
 
 if __name__ == "__main__":
+    # Required for the render pool's worker processes in the frozen (PyInstaller) exe
+    multiprocessing.freeze_support()
+    # Any command-line arguments select the headless batch mode (see batch.py)
+    if len(sys.argv) > 1:
+        from batch import main
+        sys.exit(main(sys.argv[1:]))
     try:
         app = App()
         app.mainloop()
     except (KeyboardInterrupt, EOFError):
         print("\nProgram exited.")
-        # Try to clean up on exit, though app object might not be fully init
-        try:
-            app.cleanup_temp_files()
-        except NameError:
-            pass # App not defined yet
         sys.exit(0)
 # Trigger new build
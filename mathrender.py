@@ -0,0 +1,476 @@
+"""
+Equation renderer built directly on mathtext's Agg rasterizer.
+
+Instead of creating a pyplot figure, computing a tight bbox and saving (two
+full draw passes plus the global figure manager), each equation is parsed,
+measured and rasterized once by MathTextParser and then composited onto the
+theme colours with NumPy.  No pyplot state is touched, so it is safe to call
+from worker threads.
+
+Each consumer asks for the resolution it needs (the GUI its screen scaling and
+label width, raster PDFs a print dpi).  Renders happen at levels of a
+resolution pyramid; lower resolutions of an equation already in the cache are
+downscaled from the nearest larger variant instead of being parsed again.
+"""
+import functools
+import io
+import math
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib
+import numpy as np
+from matplotlib.colors import to_rgba
+from matplotlib.font_manager import FontProperties
+from matplotlib.mathtext import MathTextParser
+from matplotlib.path import Path
+from matplotlib.textpath import TextPath
+from PIL import Image
+
+from instrument import count, now_ns, record, span
+from render_cache import THEME_KEYS, default_cache, make_key, theme_signature
+
+
+# --- Matplotlib (LaTeX) Theme ---
+
+# Configure matplotlib to use a dark background for our app
+matplotlib.rcParams.update({
+    'text.color': 'white',
+    'figure.facecolor': '#2b2b2b',  # Matches CustomTkinter's dark 'frame'
+    'savefig.facecolor': '#2b2b2b', # Matches CustomTkinter's dark 'frame'
+    'savefig.edgecolor': '#2b2b2b',
+    'savefig.transparent': False,
+})
+
+# Resolution equations are rasterized at unless a caller asks otherwise
+DEFAULT_DPI = 300
+
+# Resolution of raster equations on a printed page
+PRINT_DPI = 300
+
+# Renders happen at DEFAULT_DPI * PYRAMID_STEP**k; everything below a level is
+# derived from it by downscaling
+PYRAMID_STEP = 2 ** 0.25
+
+# mathtext keeps one pyparsing grammar per process; pyparsing's packrat
+# cache is not thread-safe, so the parse/rasterize step is serialized.
+# Compositing and PNG encoding run outside the lock.
+_PARSE_LOCK = threading.Lock()
+
+
+class MathRenderer:
+    """
+    Renders mathtext strings to RGBA arrays or PNG bytes in a single pass.
+    pad_inches matches the padding the old bbox_inches='tight' export used.
+    """
+
+    def __init__(self, pad_inches=0.1):
+        self.pad_inches = pad_inches
+        self._parser = MathTextParser("agg")
+
+    def render_rgba(self, latex_str, font_size=16, dpi=DEFAULT_DPI):
+        """Returns the equation as an (H, W, 4) uint8 array."""
+        prop = FontProperties(size=font_size)
+        with _PARSE_LOCK, span("render.mathtext", dpi=dpi):
+            parsed = self._parser.parse(f"${latex_str}$", dpi=dpi, prop=prop)
+        with span("render.composite"):
+            coverage = np.asarray(parsed.image, dtype=np.float32) / 255.0
+
+            pad = int(round(self.pad_inches * dpi))
+            coverage = np.pad(coverage, pad)
+
+            foreground, background = (np.array(color) for color in theme_colors())
+            alpha = coverage[..., None] * foreground[3]
+            rgba = background * (1.0 - alpha) + foreground * alpha
+            rgba[..., 3] = background[3] + alpha[..., 0] * (1.0 - background[3])
+            return (rgba * 255.0 + 0.5).astype(np.uint8)
+
+    def render_png(self, latex_str, font_size=16, dpi=DEFAULT_DPI):
+        """Returns the equation encoded as PNG bytes."""
+        rgba = self.render_rgba(latex_str, font_size, dpi)
+        buffer = io.BytesIO()
+        with span("render.png_encode"):
+            Image.fromarray(rgba, "RGBA").save(buffer, format="PNG", dpi=(dpi, dpi))
+        return buffer.getvalue()
+
+
+# --- Shared renderer used by the app ---
+default_renderer = MathRenderer()
+
+
+def create_math_image(latex_str, font_size=16, dpi=DEFAULT_DPI, cache=default_cache, max_width=None):
+    """
+    Renders a LaTeX string into a PNG image using matplotlib's mathtext.
+    Returns the PNG as an in-memory io.BytesIO (nothing is written to disk).
+    With max_width (pixels) the resolution is lowered until the image fits.
+    Identical renders (same LaTeX, size, dpi and theme) are served from the
+    cache, and lower resolutions are downscaled from a cached larger one.
+    """
+    try:
+        with span("render.equation", size=font_size):
+            signature = theme_signature(matplotlib.rcParams)
+            target = target_dpi(latex_str, font_size, dpi, max_width, signature)
+            png_bytes = _cached_variant(cache, latex_str, font_size, target, signature)
+
+            if png_bytes is None:
+                level = pyramid_level(target)
+                level_png = default_renderer.render_png(latex_str, font_size, level)
+                png_bytes = _finish_render(cache, latex_str, font_size, level, signature,
+                                           level_png, dpi, max_width)
+
+        # Each caller gets its own buffer so read positions don't interfere
+        return io.BytesIO(png_bytes)
+
+    except Exception as e:
+        print(f"Error rendering LaTeX: {e}")
+        return None
+
+
+# --- Resolution Pyramid ---
+
+# Equations whose variants and size are remembered (least recently used dropped)
+MAX_TRACKED_EQUATIONS = 4096
+
+# (latex_str, font_size, theme) -> {dpi: None} of variants put in the cache by this process
+_variants = OrderedDict()
+# (latex_str, font_size, theme) -> (width, height) in inches of the padded image
+_extents = OrderedDict()
+_variants_lock = threading.Lock()
+_measure_parser = MathTextParser("path")
+
+
+def _lookup(table, variant):
+    """table[variant] or None, marking it recently used.  Call with _variants_lock held."""
+    value = table.get(variant)
+    if value is not None:
+        table.move_to_end(variant)
+    return value
+
+
+def _track(table, variant, value):
+    """
+    Stores table[variant], dropping the least recently used entries beyond
+    MAX_TRACKED_EQUATIONS.  Call with _variants_lock held.
+    """
+    table[variant] = value
+    table.move_to_end(variant)
+    while len(table) > MAX_TRACKED_EQUATIONS:
+        table.popitem(last=False)
+
+
+def _round_dpi(dpi):
+    # Keeps cache keys stable for resolutions computed in different ways
+    return round(float(dpi), 2)
+
+
+def pyramid_level(dpi):
+    """The smallest pyramid level at or above dpi."""
+    steps = math.ceil(math.log(dpi / DEFAULT_DPI, PYRAMID_STEP) - 1e-9)
+    return _round_dpi(DEFAULT_DPI * PYRAMID_STEP ** steps)
+
+
+def cache_key(latex_str, font_size=16, dpi=DEFAULT_DPI):
+    """Cache key of an equation rendered at dpi under the current theme."""
+    return make_key(latex_str, font_size, _round_dpi(dpi), theme_signature(matplotlib.rcParams))
+
+
+def equation_extent(latex_str, font_size=16):
+    """
+    (width, height) in inches of the rendered, padded equation.  Known from any
+    earlier render; otherwise measured once with mathtext's (raster-free) path backend.
+    """
+    variant = (latex_str, font_size, theme_signature(matplotlib.rcParams))
+    with _variants_lock:
+        extent = _lookup(_extents, variant)
+    if extent is None:
+        with _PARSE_LOCK, span("render.measure"):
+            parsed = _measure_parser.parse(f"${latex_str}$", dpi=72, prop=FontProperties(size=font_size))
+        pad = 2 * default_renderer.pad_inches
+        extent = (parsed.width / 72 + pad, parsed.height / 72 + pad)
+        with _variants_lock:
+            _track(_extents, variant, extent)
+    return extent
+
+
+def target_dpi(latex_str, font_size, dpi, max_width=None, signature=None):
+    """
+    The resolution to use: dpi, lowered so the image is at most max_width pixels
+    wide when the equation's size is already known (else it is fitted after rendering).
+    """
+    if signature is None:
+        signature = theme_signature(matplotlib.rcParams)
+    if max_width is not None:
+        with _variants_lock:
+            extent = _lookup(_extents, (latex_str, font_size, signature))
+        if extent is not None:
+            dpi = min(dpi, max_width / extent[0])
+    return _round_dpi(dpi)
+
+
+def _store_variant(cache, latex_str, font_size, dpi, signature, png_bytes):
+    if cache is None:
+        return
+    cache.put(make_key(latex_str, font_size, dpi, signature), png_bytes)
+    variant = (latex_str, font_size, signature)
+    with _variants_lock:
+        dpis = _lookup(_variants, variant)
+        if dpis is None:
+            dpis = {}
+            _track(_variants, variant, dpis)
+        dpis[dpi] = None
+
+
+def _downscale(png_bytes, source_dpi, dpi):
+    """Resamples a rendered equation from source_dpi down to dpi."""
+    with span("render.downscale"):
+        image = Image.open(io.BytesIO(png_bytes))
+        ratio = dpi / source_dpi
+        size = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+        buffer = io.BytesIO()
+        image.resize(size, Image.LANCZOS).save(buffer, format="PNG", dpi=(dpi, dpi))
+        return buffer.getvalue()
+
+
+def _cached_variant(cache, latex_str, font_size, dpi, signature):
+    """
+    The cached render at dpi, or one downscaled from the nearest larger cached
+    variant (which is then cached too).  None if neither exists.
+    """
+    if cache is None:
+        return None
+    png_bytes = cache.get(make_key(latex_str, font_size, dpi, signature))
+    if png_bytes is not None:
+        return png_bytes
+
+    variant = (latex_str, font_size, signature)
+    with _variants_lock:
+        larger = sorted(d for d in _lookup(_variants, variant) or () if d > dpi)
+    for source_dpi in larger:
+        source = cache.get(make_key(latex_str, font_size, source_dpi, signature))
+        if source is not None:
+            png_bytes = _downscale(source, source_dpi, dpi)
+            _store_variant(cache, latex_str, font_size, dpi, signature, png_bytes)
+            return png_bytes
+        # Evicted from the cache since; forget it
+        with _variants_lock:
+            _variants.get(variant, {}).pop(source_dpi, None)
+    return None
+
+
+def _finish_render(cache, latex_str, font_size, level, signature, level_png, dpi, max_width):
+    """
+    Caches a render made at a pyramid level, records the equation's size and
+    returns the variant actually requested (dpi, fitted to max_width).
+    """
+    width, height = Image.open(io.BytesIO(level_png)).size
+    variant = (latex_str, font_size, signature)
+    with _variants_lock:
+        if _lookup(_extents, variant) is None:
+            _track(_extents, variant, (width / level, height / level))
+    _store_variant(cache, latex_str, font_size, level, signature, level_png)
+
+    target = target_dpi(latex_str, font_size, dpi, max_width, signature)
+    if target >= level:
+        return level_png
+    png_bytes = _downscale(level_png, level, target)
+    _store_variant(cache, latex_str, font_size, target, signature, png_bytes)
+    return png_bytes
+
+
+# --- Vector (outline) Rendering ---
+
+def equation_outline(latex_str, font_size=16):
+    """
+    Returns the glyph outlines of an equation for vector output, as
+    (segments, width, height): width/height are in points and segments is a
+    list of ("M"/"L", x, y), ("C", x1, y1, x2, y2, x3, y3) and ("Z",) commands
+    with the origin at the bottom-left of the ink bbox.
+    """
+    return _equation_outline(latex_str, font_size, theme_signature(matplotlib.rcParams))
+
+
+@functools.lru_cache(maxsize=256)
+def _equation_outline(latex_str, font_size, theme):
+    count("outline.built")
+    with _PARSE_LOCK, span("pdf.outline"):
+        path = TextPath((0, 0), f"${latex_str}$", prop=FontProperties(size=font_size))
+    extents = path.get_extents()
+    x0, y0 = extents.x0, extents.y0
+
+    segments = []
+    current = (0.0, 0.0)
+    for vertices, code in path.iter_segments(simplify=False, curves=True):
+        points = [(float(x - x0), float(y - y0)) for x, y in vertices.reshape(-1, 2)]
+        if code == Path.MOVETO:
+            segments.append(("M", *points[0]))
+        elif code == Path.LINETO:
+            segments.append(("L", *points[0]))
+        elif code == Path.CURVE3:
+            # Quadratic -> cubic Bezier (PDF only has cubics)
+            (qx, qy), (ex, ey) = points
+            cx, cy = current
+            segments.append(("C", cx + 2 / 3 * (qx - cx), cy + 2 / 3 * (qy - cy),
+                             ex + 2 / 3 * (qx - ex), ey + 2 / 3 * (qy - ey), ex, ey))
+        elif code == Path.CURVE4:
+            (x1, y1), (x2, y2), (ex, ey) = points
+            segments.append(("C", x1, y1, x2, y2, ex, ey))
+        elif code == Path.CLOSEPOLY:
+            segments.append(("Z",))
+            continue
+        current = points[-1]
+    return segments, float(extents.width), float(extents.height)
+
+
+def theme_colors():
+    """Returns the (text, background) RGBA colours of the current theme."""
+    rc = matplotlib.rcParams
+    background = rc['savefig.facecolor']
+    if background == 'auto':
+        background = rc['figure.facecolor']
+    background = to_rgba(background)
+    if rc['savefig.transparent']:
+        background = background[:3] + (0.0,)
+    return to_rgba(rc['text.color']), background
+
+
+def clear_caches():
+    """
+    Empties this process's mathtext parse cache (shared by every MathTextParser
+    and TextPath), the remembered variants and extents, and the outline cache.
+    The render pool's workers keep theirs.
+    """
+    with _PARSE_LOCK:
+        MathTextParser._parse_cached.cache_clear()
+    with _variants_lock:
+        _variants.clear()
+        _extents.clear()
+    _equation_outline.cache_clear()
+
+
+# --- Parallel Rendering ---
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Returns the shared render pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _pool
+
+
+def shutdown_pool():
+    """Stops the shared render pool (it is restarted on next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _render_png_worker(latex_str, font_size, dpi, theme):
+    """Pool entry point: renders one equation under the caller's theme."""
+    with matplotlib.rc_context(theme):
+        return default_renderer.render_png(latex_str, font_size, dpi)
+
+
+def iter_render(requests, dpi=DEFAULT_DPI, cache=default_cache, cancel_event=None, max_width=None):
+    """
+    Renders a batch of (latex_str, font_size) or (latex_str, font_size, dpi)
+    requests in parallel and yields (index, io.BytesIO or None) for each request
+    as soon as it is ready.  dpi and max_width apply to requests without their
+    own dpi.  Cache hits (and downscales of cached larger variants) are yielded
+    first and duplicates are only rendered once.
+    Setting cancel_event stops the iteration and drops queued renders.
+    """
+    theme = {key: matplotlib.rcParams[key] for key in THEME_KEYS}
+    signature = theme_signature(matplotlib.rcParams)
+
+    indices = {}
+    for index, request in enumerate(requests):
+        latex_str, font_size = request[:2]
+        request_dpi = request[2] if len(request) > 2 else dpi
+        indices.setdefault((latex_str, font_size, request_dpi), []).append(index)
+
+    pending = {}
+    for request, key_indices in indices.items():
+        latex_str, font_size, request_dpi = request
+        target = target_dpi(latex_str, font_size, request_dpi, max_width, signature)
+        png_bytes = _cached_variant(cache, latex_str, font_size, target, signature)
+        if png_bytes is not None:
+            for index in key_indices:
+                yield index, io.BytesIO(png_bytes)
+        else:
+            pending[request] = pyramid_level(target)
+
+    def finish(request, level, level_png):
+        latex_str, font_size, request_dpi = request
+        png_bytes = None
+        if level_png is not None:
+            png_bytes = _finish_render(cache, latex_str, font_size, level, signature,
+                                       level_png, request_dpi, max_width)
+        return [(index, io.BytesIO(png_bytes) if png_bytes is not None else None)
+                for index in indices[request]]
+
+    if not pending:
+        return
+
+    try:
+        pool = _get_pool()
+        submitted = now_ns()
+        futures = {pool.submit(_render_png_worker, request[0], request[1], level, theme): request
+                   for request, level in pending.items()}
+    except Exception as e:
+        print(f"Warning: render pool unavailable, rendering serially. Error: {e}")
+        futures = {}
+
+    try:
+        for future in as_completed(futures):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            request = futures[future]
+            try:
+                png_bytes = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                print(f"Error rendering LaTeX: {e}")
+                png_bytes = None
+            level = pending.pop(request)
+            # Time from submit to result, as seen from this process
+            record("render.pool", submitted, now_ns(), {"dpi": level})
+            yield from finish(request, level, png_bytes)
+    except BrokenProcessPool as e:
+        # Pool died mid-batch; finish whatever is left in this process
+        print(f"Warning: render pool unavailable, rendering serially. Error: {e}")
+        shutdown_pool()
+    finally:
+        for future in futures:
+            future.cancel()
+
+    for request, level in list(pending.items()):
+        if cancel_event is not None and cancel_event.is_set():
+            return
+        try:
+            png_bytes = default_renderer.render_png(request[0], request[1], level)
+        except Exception as e:
+            print(f"Error rendering LaTeX: {e}")
+            png_bytes = None
+        yield from finish(request, level, png_bytes)
+
+
+def render_many(requests, dpi=DEFAULT_DPI, cache=default_cache, max_width=None):
+    """
+    Renders a batch of (latex_str, font_size[, dpi]) requests in parallel.
+    Returns a list of io.BytesIO (or None on failure) in the same order.
+    """
+    results = [None] * len(requests)
+    for index, buffer in iter_render(requests, dpi, cache, max_width=max_width):
+        results[index] = buffer
+    return results
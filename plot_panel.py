@@ -0,0 +1,202 @@
+"""
+Interactive theta(y,t) plots embedded in the app.
+
+The left plot shows theta against y for a few fixed t, the right one theta
+against t for a few fixed y; sliders set β, Pr, k1 and ko.  Curves are
+evaluated with the Talbot inversion (accurate over the slider ranges, which
+keep k1 >= 0, unlike a truncated series) and cached per curve and parameter
+set, so dragging a slider back over visited values costs nothing.  The figure is built once: the axes,
+ticks and labels are cached as a background bitmap and a slider move only
+re-draws the curves on top of it (blitting).
+"""
+from collections import OrderedDict
+
+import customtkinter as ctk
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+
+from inverse_laplace import theta_talbot_grid
+
+
+# --- Plot ranges and the fixed curves ---
+Y_MAX = 3.0
+T_MIN, T_MAX = 0.02, 5.0
+CURVE_POINTS = 200
+T_CURVES = (0.1, 0.5, 1.0, 2.0, 5.0)
+Y_CURVES = (0.25, 0.5, 1.0, 2.0)
+
+# (key, label, from, to, steps, default) for each slider
+SLIDERS = (
+    ("beta", "β", 0.0, 1.0, 100, 0.5),
+    ("pr", "Pr", 0.05, 10.0, 199, 0.71),
+    ("k1", "k1(β)", 0.0, 5.0, 100, 2.5),
+    ("k0", "ko(β)", 0.2, 5.0, 96, 1.0),
+)
+
+# Curves kept in the cache (one curve is CURVE_POINTS floats)
+MAX_CACHED_CURVES = 4096
+
+# Same colours as the equation images
+BACKGROUND = "#2b2b2b"
+FOREGROUND = "white"
+
+
+class ThetaCurves:
+    """
+    Evaluates and caches the plotted curves.
+
+    theta depends on the inputs only through y sqrt(Pr/ko), k1/ko, β and t, so
+    each curve is cached under those (rounded) values: changing Pr and ko
+    together, or returning to an earlier slider position, is a cache hit.
+    """
+
+    def __init__(self, max_curves=MAX_CACHED_CURVES):
+        self.y_axis = np.linspace(0.0, Y_MAX, CURVE_POINTS)
+        self.t_axis = np.geomspace(T_MIN, T_MAX, CURVE_POINTS)
+        self.max_curves = max_curves
+        self._cache = OrderedDict()
+
+    @staticmethod
+    def _key(kind, fixed, beta, scale, ratio):
+        return (kind, fixed) + tuple(round(float(v), 12) for v in (beta, scale, ratio))
+
+    def curves(self, beta, pr, k1, k0):
+        """
+        Returns ([theta(y) for t in T_CURVES], [theta(t) for y in Y_CURVES]);
+        only curves missing from the cache are evaluated (in one batch per kind).
+        """
+        scale, ratio = np.sqrt(pr / k0), k1 / k0
+        y_keys = [self._key("y", t, beta, scale, ratio) for t in T_CURVES]
+        t_keys = [self._key("t", y, beta, scale, ratio) for y in Y_CURVES]
+
+        missing_t = [t for t, key in zip(T_CURVES, y_keys) if key not in self._cache]
+        if missing_t:
+            grid = theta_talbot_grid(self.y_axis * scale, missing_t, 1.0, beta, ratio, 1.0)
+            for t, column in zip(missing_t, grid.T):
+                self._store(self._key("y", t, beta, scale, ratio), column)
+
+        missing_y = [y for y, key in zip(Y_CURVES, t_keys) if key not in self._cache]
+        if missing_y:
+            grid = theta_talbot_grid(np.array(missing_y) * scale, self.t_axis, 1.0, beta, ratio, 1.0)
+            for y, row in zip(missing_y, grid):
+                self._store(self._key("t", y, beta, scale, ratio), row)
+
+        return [self._get(key) for key in y_keys], [self._get(key) for key in t_keys]
+
+    def _get(self, key):
+        self._cache.move_to_end(key)
+        return self._cache[key]
+
+    def _store(self, key, values):
+        self._cache[key] = values
+        while len(self._cache) > self.max_curves:
+            self._cache.popitem(last=False)
+
+
+class ThetaPlotPanel(ctk.CTkFrame):
+    """
+    Frame with the two theta plots and one slider per parameter.
+    initial_values maps beta/pr/k1/k0 to starting slider values.
+    """
+
+    def __init__(self, master, initial_values=None, **kwargs):
+        super().__init__(master, **kwargs)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.model = ThetaCurves()
+        self._background = None
+        self._pending = False
+
+        # --- Figure (built once; only the curves are redrawn afterwards) ---
+        self.figure = Figure(figsize=(7, 3.2), dpi=100, facecolor=BACKGROUND)
+        self.ax_y, self.ax_t = self.figure.subplots(1, 2)
+        for ax, xlabel in ((self.ax_y, "y"), (self.ax_t, "t")):
+            ax.set_facecolor(BACKGROUND)
+            ax.set_xlabel(xlabel, color=FOREGROUND)
+            ax.set_ylim(-0.05, 1.05)
+            ax.tick_params(colors=FOREGROUND)
+            for spine in ax.spines.values():
+                spine.set_color("gray")
+            ax.grid(True, color="#444444", linewidth=0.5)
+        self.ax_y.set_ylabel("θ(y,t)", color=FOREGROUND)
+        self.ax_y.set_xlim(0.0, Y_MAX)
+        self.ax_t.set_xscale("log")
+        self.ax_t.set_xlim(T_MIN, T_MAX)
+
+        self.y_lines = [self.ax_y.plot([], [], label=f"t = {t:g}", animated=True)[0] for t in T_CURVES]
+        self.t_lines = [self.ax_t.plot([], [], label=f"y = {y:g}", animated=True)[0] for y in Y_CURVES]
+        for ax in (self.ax_y, self.ax_t):
+            # Legend handles are static copies of the line styles, so the legend is background
+            ax.legend(fontsize=8, facecolor=BACKGROUND, edgecolor="gray", labelcolor=FOREGROUND)
+        self.figure.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas.get_tk_widget().grid(row=0, column=0, padx=10, pady=(10, 0), sticky="nsew")
+        self.canvas.mpl_connect("draw_event", self.on_draw)
+
+        # --- Sliders ---
+        initial_values = initial_values or {}
+        self.sliders = {}
+        self.value_labels = {}
+        slider_frame = ctk.CTkFrame(self, fg_color="transparent")
+        slider_frame.grid(row=1, column=0, padx=10, pady=10, sticky="ew")
+        slider_frame.grid_columnconfigure(1, weight=1)
+        for row, (key, label_text, low, high, steps, default) in enumerate(SLIDERS):
+            label = ctk.CTkLabel(slider_frame, text=f"{label_text}:", font=ctk.CTkFont(size=14))
+            label.grid(row=row, column=0, padx=(10, 10), pady=4, sticky="w")
+
+            slider = ctk.CTkSlider(slider_frame, from_=low, to=high, number_of_steps=steps,
+                                   command=lambda _value: self.schedule_update())
+            slider.grid(row=row, column=1, padx=10, pady=4, sticky="ew")
+            slider.set(min(max(initial_values.get(key, default), low), high))
+            self.sliders[key] = slider
+
+            value_label = ctk.CTkLabel(slider_frame, text="", width=60, font=ctk.CTkFont(size=14))
+            value_label.grid(row=row, column=2, padx=(10, 10), pady=4, sticky="e")
+            self.value_labels[key] = value_label
+
+        self.update_curves()
+
+    def values(self):
+        return {key: float(slider.get()) for key, slider in self.sliders.items()}
+
+    def schedule_update(self):
+        """Coalesces slider events: at most one update per pass of the Tk loop."""
+        if not self._pending:
+            self._pending = True
+            self.after_idle(self.update_curves)
+
+    def update_curves(self):
+        self._pending = False
+        values = self.values()
+        for key, value in values.items():
+            self.value_labels[key].configure(text=f"{value:.3g}")
+
+        y_curves, t_curves = self.model.curves(values["beta"], values["pr"], values["k1"], values["k0"])
+        for line, curve in zip(self.y_lines, y_curves):
+            line.set_data(self.model.y_axis, curve)
+        for line, curve in zip(self.t_lines, t_curves):
+            line.set_data(self.model.t_axis, curve)
+        self.blit()
+
+    # --- Blitting ---
+
+    def on_draw(self, event):
+        """After a full draw (first show, resize), caches the static background."""
+        self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.draw_curves()
+
+    def draw_curves(self):
+        for line in self.y_lines + self.t_lines:
+            self.figure.draw_artist(line)
+
+    def blit(self):
+        if self._background is None:
+            # Not drawn yet; on_draw will put the curves up
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self.draw_curves()
+        self.canvas.blit(self.figure.bbox)
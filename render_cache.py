@@ -0,0 +1,154 @@
+"""
+Content-addressed cache for rendered equation images.
+
+Entries are keyed on everything that affects the rendered pixels (LaTeX source,
+font size, dpi and the matplotlib theme) and hold the encoded image bytes.
+The in-memory tier is an LRU bounded by total bytes; an optional on-disk tier
+keeps entries across runs and is trimmed oldest-access-first.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from instrument import count
+
+
+# --- rcParams that change how an equation looks ---
+THEME_KEYS = (
+    "text.color",
+    "figure.facecolor",
+    "savefig.facecolor",
+    "savefig.edgecolor",
+    "savefig.transparent",
+    "mathtext.fontset",
+    "font.family",
+)
+
+
+def theme_signature(rc_params):
+    """Returns a hashable snapshot of the theme-relevant rcParams."""
+    return tuple((key, repr(rc_params.get(key))) for key in THEME_KEYS)
+
+
+def make_key(latex_str, font_size, dpi, theme):
+    """Returns the content address (hex sha256) of one rendered equation."""
+    digest = hashlib.sha256()
+    for part in (latex_str, repr(font_size), repr(dpi), repr(theme)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Thread-safe LRU of rendered image bytes with an optional disk tier.
+    max_bytes bounds the memory tier, max_disk_bytes the disk tier.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None,
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def get(self, key):
+        """Returns the cached bytes for key, or None."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                count("render_cache.hit")
+                return data
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "rb") as fh:
+                    data = fh.read()
+                os.utime(path)  # Mark as recently used for disk eviction
+            except OSError:
+                data = None
+            if data is not None:
+                self._store(key, data)
+                with self._lock:
+                    self.hits += 1
+                count("render_cache.disk_hit")
+                return data
+
+        with self._lock:
+            self.misses += 1
+        count("render_cache.miss")
+        return None
+
+    def put(self, key, data):
+        """Stores data under key in memory and, if enabled, on disk."""
+        self._store(key, data)
+        if self.disk_dir:
+            try:
+                tmp_path = self._disk_path(key) + ".tmp"
+                with open(tmp_path, "wb") as fh:
+                    fh.write(data)
+                os.replace(tmp_path, self._disk_path(key))
+                self._trim_disk()
+            except OSError as e:
+                print(f"Warning: could not write render cache entry. Error: {e}")
+
+    def clear(self):
+        """Drops the memory tier (the disk tier is left alone)."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _store(self, key, data):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            if len(data) > self.max_bytes:
+                return
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+# --- Shared cache used by the app ---
+# Set LAPLACE_RENDER_CACHE_DIR to also keep rendered equations on disk.
+default_cache = RenderCache(disk_dir=os.environ.get("LAPLACE_RENDER_CACHE_DIR") or None)
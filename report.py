@@ -0,0 +1,272 @@
+"""
+PDF report building, independent of the GUI.
+
+Both the CTk app and the headless batch mode (batch.py) use these functions,
+so nothing here may import customtkinter.  ReportLab is only imported here,
+and the app only imports this module when a PDF is actually requested.
+
+Vector equations are written once per document as form XObjects and every
+page that shows one only references it, so a multi-report PDF grows with the
+number of distinct equations, not the number of reports.
+"""
+import hashlib
+
+import reportlab
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen.canvas import FILL_NON_ZERO
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Flowable, Image as ReportLabImage
+from reportlab.platypus.frames import Frame
+from reportlab.platypus.doctemplate import NextPageTemplate, PageBegin, PageBreakIfNotEmpty, PageTemplate
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+
+from instrument import span
+from mathrender import equation_outline, theme_colors
+
+
+# Width every equation is scaled to on the page
+EQUATION_WIDTH = 6.5 * inch
+
+# ReportLab releases whose BaseDocTemplate.build ReportWriter's streaming mirrors
+# (4.4 is pinned in requirements.txt); recheck the hooks listed there before adding one
+STREAMING_REPORTLAB_VERSIONS = ("4.4.", "5.0.")
+
+
+class VectorEquation(Flowable):
+    """
+    An equation drawn straight onto the PDF canvas as filled glyph outlines,
+    so it stays crisp at any zoom.  Laid out like the old 300-dpi PNGs: the
+    theme background, 0.1 inch of padding, scaled to EQUATION_WIDTH.
+    The drawing is a form XObject shared by every identical equation in the document.
+    """
+
+    def __init__(self, latex_str, font_size=16, width=EQUATION_WIDTH, pad=0.1 * inch):
+        super().__init__()
+        self.latex_str, self.font_size = latex_str, font_size
+        self.segments, ink_width, ink_height = equation_outline(latex_str, font_size)
+        self.pad = pad
+        self.scale = width / (ink_width + 2 * pad)
+        self.width = width
+        self.height = (ink_height + 2 * pad) * self.scale
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        canvas = self.canv
+        text_color, background = theme_colors()
+        digest = hashlib.sha1(repr((self.latex_str, self.font_size, self.width, self.pad,
+                                    text_color, background)).encode("utf-8"))
+        name = f"Eq{digest.hexdigest()}"
+        if not canvas.hasForm(name):
+            canvas.beginForm(name, 0, 0, self.width, self.height)
+            self.draw_outline(text_color, background)
+            canvas.endForm()
+        canvas.doForm(name)
+
+    def draw_outline(self, text_color, background):
+        canvas = self.canv
+        canvas.saveState()
+
+        if background[3] > 0:
+            canvas.setFillColorRGB(*background[:3], alpha=background[3])
+            canvas.rect(0, 0, self.width, self.height, stroke=0, fill=1)
+
+        canvas.translate(self.pad * self.scale, self.pad * self.scale)
+        canvas.scale(self.scale, self.scale)
+        path = canvas.beginPath()
+        for command, *coords in self.segments:
+            if command == "M":
+                path.moveTo(*coords)
+            elif command == "L":
+                path.lineTo(*coords)
+            elif command == "C":
+                path.curveTo(*coords)
+            else:
+                path.close()
+        canvas.setFillColorRGB(*text_color[:3], alpha=text_color[3])
+        canvas.drawPath(path, stroke=0, fill=1, fillMode=FILL_NON_ZERO)
+        canvas.restoreState()
+
+
+def build_story(values, derivation_content, img_buffers=None, styles=None):
+    """
+    Returns the ReportLab flowables for one report.
+    Equations are drawn as vector outlines; pass img_buffers (one rendered PNG
+    or None per latex item, in order) to embed raster images instead.
+    """
+    if styles is None:
+        styles = getSampleStyleSheet()
+    story = []
+    
+    # 1. Add Title
+    story.append(Paragraph("Dr Syed Tauseef's Derivation Report", styles['h1']))
+    story.append(Spacer(1, 0.25 * inch))
+    
+    # 2. Add Inputs
+    story.append(Paragraph("Input Values", styles['h2']))
+    story.append(Paragraph(f"Pr: {values['pr']}", styles['Normal']))
+    story.append(Paragraph(f"y: {values['y']}", styles['Normal']))
+    story.append(Paragraph(f"β: {values['beta']}", styles['Normal']))
+    story.append(Paragraph(f"k1(β): {values['k1']}", styles['Normal']))
+    story.append(Paragraph(f"ko(β): {values['k0']}", styles['Normal']))
+    story.append(Spacer(1, 0.25 * inch))
+
+    # 3. Add Derivation Steps
+    story.append(Paragraph("Derivation Steps", styles['h2']))
+
+    img_buffers = iter(img_buffers) if img_buffers is not None else None
+    for item in derivation_content:
+        if item["type"] == "text":
+            # Convert bold/size to simple style
+            if item.get("weight") == "bold":
+                style = styles['h3']
+            else:
+                style = styles['Normal']
+            # Replace \n with <br/> for PDF paragraphs
+            text_content = item['content'].replace('\n', '<br/>')
+            story.append(Paragraph(text_content, style))
+            story.append(Spacer(1, 0.1 * inch))
+        
+        elif item["type"] == "latex" and img_buffers is None:
+            story.append(VectorEquation(item["content"], item.get("size", 16)))
+            story.append(Spacer(1, 0.1 * inch))
+
+        elif item["type"] == "latex":
+            img_buffer = next(img_buffers)
+            if img_buffer:
+                # Add image to PDF, scaling it to fit width
+                rl_img = ReportLabImage(img_buffer, width=EQUATION_WIDTH, height=None)
+                rl_img.drawHeight = rl_img.drawHeight * (EQUATION_WIDTH / rl_img.drawWidth) # Maintain aspect ratio
+                rl_img.drawWidth = EQUATION_WIDTH
+                story.append(rl_img)
+                story.append(Spacer(1, 0.1 * inch))
+
+    return story
+
+
+def new_document(filename):
+    """Returns the letter-size, one-inch-margin document every report uses."""
+    return SimpleDocTemplate(filename, pagesize=letter,
+                             rightMargin=inch, leftMargin=inch,
+                             topMargin=inch, bottomMargin=inch)
+
+
+def build_pdf(filename, values, derivation_content, img_buffers=None):
+    """Writes a single report to filename (vector equations unless img_buffers is given)."""
+    with span("pdf.story"):
+        story = build_story(values, derivation_content, img_buffers)
+    with span("pdf.layout"):
+        new_document(filename).build(story)
+
+
+class ReportWriter:
+    """
+    Writes reports into one PDF one at a time, each starting on a new page.
+
+    SimpleDocTemplate.build needs the whole story up front; this drives the
+    same document template report by report instead, so only the report being
+    laid out is held as flowables.  Use as a context manager, or call close().
+
+    The streaming mirrors BaseDocTemplate.build step by step and so relies on
+    its private hooks: _calc, _startBuild, _endBuild, clean_hanging,
+    handle_flowable, _hanging/PageBegin, _samePT, _setPageTemplate,
+    _onProgress, canv._doctemplate and canv._doc.info.  It is only used on the
+    ReportLab releases in STREAMING_REPORTLAB_VERSIONS, where those were
+    checked against build(); on any other release the reports are collected
+    and written with the public build() (same PDF, the whole story in memory).
+    """
+
+    def __init__(self, filename):
+        self.doc = new_document(filename)
+        self.styles = getSampleStyleSheet()
+        self.streaming = reportlab.Version.startswith(STREAMING_REPORTLAB_VERSIONS)
+        self._story = []
+        self._started = False
+        self._handled = 0
+
+    def _start(self):
+        doc = self.doc
+        doc._calc()
+        frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
+        doc.addPageTemplates([PageTemplate(id='First', frames=frame, pagesize=doc.pagesize),
+                              PageTemplate(id='Later', frames=frame, pagesize=doc.pagesize)])
+        if doc._onProgress:
+            doc._onProgress('STARTED', 0)
+        doc._startBuild()
+        # build() restores the info dictionary at the end (embedded PDFs may replace it)
+        self._saved_info = doc.canv._doc.info
+        doc.canv._doctemplate = doc
+        self._started = True
+
+    def add(self, values, derivation_content, img_buffers=None):
+        """Lays out one report and emits its pages."""
+        with span("pdf.story"):
+            story = build_story(values, derivation_content, img_buffers, self.styles)
+        if not self.streaming:
+            if self._story:
+                self._story.append(PageBreak())
+            self._story.extend(story)
+            return
+        if self._started:
+            story.insert(0, PageBreak())
+        else:
+            self._start()
+        doc = self.doc
+        with span("pdf.layout"):
+            while story:
+                if doc._hanging and doc._hanging[-1] is PageBegin and isinstance(story[0], PageBreakIfNotEmpty):
+                    next_template = story[0].nextTemplate
+                    if next_template and not doc._samePT(next_template):
+                        NextPageTemplate(next_template).apply(doc)
+                        doc._setPageTemplate()
+                    del story[0]
+                doc.clean_hanging()
+                doc.handle_flowable(story)
+                self._handled += 1
+                if doc._onProgress:
+                    doc._onProgress('PROGRESS', self._handled)
+
+    def close(self):
+        """Finishes the last page and writes the file."""
+        if not self.streaming:
+            with span("pdf.layout"):
+                self.doc.build(self._story)
+            return
+        if not self._started:
+            self._start()
+        doc = self.doc
+        del doc.canv._doctemplate
+        doc.canv._doc.info = self._saved_info
+        with span("pdf.write"):
+            doc._endBuild()
+        if doc._onProgress:
+            doc._onProgress('FINISHED', 0)
+
+    def abort(self):
+        """Drops a partly written document (nothing is saved), as build() does on an error."""
+        if self._started and hasattr(self.doc.canv, "_doctemplate"):
+            del self.doc.canv._doctemplate
+        self._story = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def build_combined_pdf(filename, reports):
+    """
+    Writes several reports into one PDF, each starting on a new page.
+    reports is an iterable of (values, derivation_content, img_buffers),
+    where img_buffers may be None for vector equations.  It is consumed one
+    report at a time, so a generator keeps memory independent of its length.
+    """
+    with ReportWriter(filename) as writer:
+        for values, derivation_content, img_buffers in reports:
+            writer.add(values, derivation_content, img_buffers)
@@ -0,0 +1,874 @@
+"""
+Numeric evaluation of the Eq (30) double series for theta(y,t).
+
+The general term of Eq (30) is
+
+    (Pr)^(K/2) (-y)^K (-1)^l (k1)^l Gamma(K/2 + l) t^(l - (1-β)K/2)
+    ---------------------------------------------------------------
+      K! l! (ko)^(K/2 + l) Gamma(K/2) Gamma(1 - (1-β)K/2 + l)
+
+It separates into a y-only factor (-y sqrt(Pr/ko))^K and a t-only factor
+t^(-(1-β)K/2) * sum_l c[K,l] (-k1 t / ko)^l / Gamma(1 - (1-β)K/2 + l),
+so a whole (y,t) grid is one matrix product over K.  Every factor is built
+in log space (gammaln) and only exponentiated after rescaling, so large K
+and l never overflow on their own.
+
+Differentiating term by term keeps the same structure: d/dy turns the y factor
+into -K sqrt(Pr/ko) (-y sqrt(Pr/ko))^(K-1), and d/dt multiplies each (K,l)
+term by (l - (1-β)K/2) / t, so theta_fields() gets theta, dtheta/dy and
+dtheta/dt from one pass over the coefficient table.  At y = 0 only K = 1 is
+left in dtheta/dy, which gives the wall flux -dtheta/dy(0,t) = sqrt(Pr/ko) T_1(t).
+
+With k1 = 0 only the l = 0 terms survive and theta is the Wright function
+W(-x; -α, 1) of the single variable x = y sqrt(Pr/ko) t^(-α), α = (1-β)/2.
+Every evaluator detects that case (and |k1| t/ko below rounding) and switches
+to a dedicated kernel: the single series up to the x where its truncation
+and rounding stay below _WRIGHT_SERIES_TOLERANCE, and beyond it Kanter's
+integral representation, whose integrand is positive.  On a grid the
+series part is again one matrix product, and the integral is interpolated
+in x from a small table of exact values rather than integrated per point.
+"""
+import functools
+import threading
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from scipy.special import gammaln, gammasgn, rgamma
+
+from instrument import count, timed
+
+
+# --- Default truncation of the K and l sums ---
+DEFAULT_K_TERMS = 80
+DEFAULT_L_TERMS = 40
+
+# Points evaluated per batch by theta (bounds its (points x K) work arrays)
+BATCH_SIZE = 65536
+
+# --- Size limits of the cached per-β coefficient tables ---
+MAX_TABLE_BETAS = 16
+MAX_TABLE_BYTES = 256 * 2**20
+
+
+def _orders(n_k, n_l):
+    """K = 1..n_k as a column and l = 0..n_l-1 as a row, for broadcasting."""
+    return (np.arange(1, n_k + 1, dtype=float)[:, None],
+            np.arange(n_l, dtype=float)[None, :])
+
+
+def _log_coefficients(K, l):
+    """
+    log of Gamma(K/2 + l) / (K! l! Gamma(K/2)) for broadcastable arrays of K and l.
+    """
+    return gammaln(K / 2 + l) - gammaln(K + 1) - gammaln(l + 1) - gammaln(K / 2)
+
+
+def _log_reciprocal_gamma(beta, K, l):
+    """
+    log|1/Gamma(1 - (1-β)K/2 + l)| and its sign for broadcastable arrays of K and l.
+    At the poles of Gamma the reciprocal is exactly zero (log = -inf, sign = 0).
+    """
+    arg = 1.0 - (1.0 - beta) * K / 2 + l
+    pole = (arg <= 0) & (arg == np.round(arg))
+    safe_arg = np.where(pole, 0.5, arg)
+    log_rg = np.where(pole, -np.inf, -gammaln(safe_arg))
+    sign_rg = np.where(pole, 0.0, gammasgn(safe_arg))
+    return log_rg, sign_rg
+
+
+# --- Coefficient tables ---
+
+class CoefficientTables:
+    """
+    Precomputed K,l tables for the Eq (30) general term.
+
+    log c[K,l] = log(Gamma(K/2 + l) / (K! l! Gamma(K/2))) depends on nothing but
+    K and l, so it is computed once (row K-1, column l) and only ever grown.
+    For each β the log-term table log c[K,l] - log|Gamma(1 - (1-β)K/2 + l)|
+    and its int8 sign are kept in an LRU bounded by max_betas entries and
+    max_bytes in total, so a sweep over the other inputs never calls a special
+    function again.  Each β entry is sized by the requests made for that β,
+    not by the shared c table.  The c table can be saved to .npy and loaded
+    memory-mapped.
+    """
+
+    def __init__(self, log_coefficients=None, max_betas=MAX_TABLE_BETAS, max_bytes=MAX_TABLE_BYTES):
+        self._log_coef = log_coefficients if log_coefficients is not None else np.empty((0, 0))
+        self._by_beta = OrderedDict()
+        self.max_betas = max_betas
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self._log_coef.shape
+
+    @staticmethod
+    def _grown(current, needed):
+        """Size of one table axis holding needed; grows geometrically to amortize."""
+        if needed <= current:
+            return current
+        return max(needed, min(2 * current, 4096), 64)
+
+    def _grow(self, n_k, n_l):
+        """Makes the c table at least (n_k, n_l), growing only the axes that are short."""
+        cur_k, cur_l = self._log_coef.shape
+        if n_k <= cur_k and n_l <= cur_l:
+            return
+        K, l = _orders(self._grown(cur_k, n_k), self._grown(cur_l, n_l))
+        self._log_coef = _log_coefficients(K, l)
+
+    def log_coefficients(self, n_k, n_l):
+        """log c[K,l] for K = 1..n_k, l = 0..n_l-1."""
+        with self._lock:
+            self._grow(n_k, n_l)
+            return self._log_coef[:n_k, :n_l]
+
+    def log_terms(self, beta, n_k, n_l):
+        """
+        log|c[K,l] / Gamma(1 - (1-β)K/2 + l)| and its sign for K = 1..n_k,
+        l = 0..n_l-1 (poles of Gamma give log -inf and sign 0).
+        """
+        beta = float(beta)
+        with self._lock:
+            entry = self._by_beta.get(beta)
+            if entry is None or entry[0].shape[0] < n_k or entry[0].shape[1] < n_l:
+                count("coefficient_tables.miss")
+                entry = self._extend(beta, entry, n_k, n_l)
+                self._by_beta[beta] = entry
+            else:
+                count("coefficient_tables.hit")
+            self._by_beta.move_to_end(beta)
+            # Evict least recently used β entries, never the one being returned
+            while len(self._by_beta) > 1 and (len(self._by_beta) > self.max_betas or
+                                              self._cached_bytes() > self.max_bytes):
+                self._by_beta.popitem(last=False)
+            return entry[0][:n_k, :n_l], entry[1][:n_k, :n_l]
+
+    def _extend(self, beta, entry, n_k, n_l):
+        """
+        A β entry covering at least (n_k, n_l).  Short axes grow by a quarter, so
+        the entry stays close to the largest request, and only the added cells
+        are computed.
+        """
+        cur_k, cur_l = entry[0].shape if entry is not None else (0, 0)
+        new_k = cur_k if n_k <= cur_k else max(n_k, min(cur_k + cur_k // 4, 4096), 64)
+        new_l = cur_l if n_l <= cur_l else max(n_l, min(cur_l + cur_l // 4, 4096), 64)
+        self._grow(new_k, new_l)
+        log_table = np.empty((new_k, new_l))
+        sign_table = np.empty((new_k, new_l), dtype=np.int8)
+        if entry is not None:
+            log_table[:cur_k, :cur_l], sign_table[:cur_k, :cur_l] = entry
+        added = ((slice(0, cur_k), slice(cur_l, new_l)), (slice(cur_k, new_k), slice(0, new_l)))
+        for rows, cols in added:
+            K = np.arange(rows.start + 1, rows.stop + 1, dtype=float)[:, None]
+            l = np.arange(cols.start, cols.stop, dtype=float)[None, :]
+            log_rg, sign_rg = _log_reciprocal_gamma(beta, K, l)
+            log_table[rows, cols] = self._log_coef[rows, cols] + log_rg
+            sign_table[rows, cols] = sign_rg
+        return log_table, sign_table
+
+    def _cached_bytes(self):
+        return sum(log.nbytes + sign.nbytes for log, sign in self._by_beta.values())
+
+    def save(self, path):
+        """Writes the c table to an .npy file."""
+        with self._lock:
+            np.save(path, np.asarray(self._log_coef))
+
+    @classmethod
+    def load(cls, path, mmap=True, max_betas=MAX_TABLE_BETAS, max_bytes=MAX_TABLE_BYTES):
+        """Loads a saved c table, memory-mapped by default."""
+        return cls(np.load(path, mmap_mode="r" if mmap else None), max_betas=max_betas,
+                   max_bytes=max_bytes)
+
+
+# --- Shared tables used by every evaluator ---
+default_tables = CoefficientTables()
+
+
+def _signed_logsumexp(log_terms, signs, axis=-1):
+    """Sum sign*exp(log_terms) along an axis; returns (log|sum|, sign(sum))."""
+    masked = np.where(signs != 0, log_terms, -np.inf)
+    peak = np.max(masked, axis=axis, keepdims=True)
+    peak = np.where(np.isfinite(peak), peak, 0.0)
+    total = np.sum(signs * np.exp(masked - peak), axis=axis)
+    with np.errstate(divide="ignore"):
+        log_total = np.log(np.abs(total)) + np.squeeze(peak, axis=axis)
+    return log_total, np.sign(total)
+
+
+def _y_factors(y, pr, k0, K):
+    """log|(-y sqrt(Pr/ko))^K| and its sign for the orders K, shape (len(y), len(K))."""
+    with np.errstate(divide="ignore"):
+        log_base = np.log(np.abs(y)) + 0.5 * np.log(pr / k0)
+    log_y = log_base[:, None] * K[None, :]
+    sign_y = np.sign(-y)[:, None] ** K[None, :]
+    return log_y, sign_y
+
+
+def _dy_factors(y, pr, k0, K):
+    """log|d/dy (-y sqrt(Pr/ko))^K| and its sign, shape (len(y), len(K))."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_scale = 0.5 * np.log(pr / k0)
+        log_base = np.log(np.abs(y)) + log_scale
+        # (K-1) * log|base| with K = 1 pinned to 0 so that y = 0 stays finite
+        log_power = np.where(K[None, :] == 1, 0.0, log_base[:, None] * (K[None, :] - 1))
+    log_dy = np.log(K)[None, :] + log_scale + log_power
+    sign_dy = -np.sign(-y)[:, None] ** (K[None, :] - 1)
+    return log_dy, sign_dy
+
+
+def _t_factors(t, beta, k1, k0, log_table, sign_table, derivative=False):
+    """
+    log|T_K(t)| and its sign, shape (len(t), n_k), where
+    T_K(t) = t^(-(1-β)K/2) * sum_l c[K,l] (-k1 t/ko)^l / Gamma(1 - (1-β)K/2 + l)
+    and log_table/sign_table come from CoefficientTables.log_terms.
+    With derivative, log|T_K'(t)| and its sign are returned as well, from the
+    same terms weighted by (l - (1-β)K/2) / t.
+    """
+    n_k, n_l = log_table.shape
+    # The (t, K, l) terms are summed a batch of t values at a time
+    batch = max(1, BATCH_SIZE // n_l)
+    if len(t) > batch:
+        parts = [_t_factors(t[start:start + batch], beta, k1, k0, log_table, sign_table, derivative)
+                 for start in range(0, len(t), batch)]
+        return tuple(np.concatenate(part) for part in zip(*parts))
+    K, l = (orders.ravel() for orders in _orders(n_k, n_l))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_t = np.log(t)
+        log_z = np.log(np.abs(k1 / k0)) + log_t
+        # l * log|z| with the l = 0 column pinned to 0 so that k1 = 0 stays finite
+        l_log_z = np.where(l[None, :] == 0, 0.0, log_z[:, None] * l[None, :])
+    sign_z = -np.sign(k1)
+
+    log_terms = log_table[None, :, :] + l_log_z[:, None, :]
+    signs = sign_table[None, :, :] * (sign_z ** l)[None, None, :]
+    log_sum, sign_sum = _signed_logsumexp(log_terms, signs, axis=-1)
+
+    log_T = log_sum - (1.0 - beta) / 2 * K[None, :] * log_t[:, None]
+    if not derivative:
+        return log_T, sign_sum
+
+    power = l[None, :] - (1.0 - beta) / 2 * K[:, None]
+    with np.errstate(divide="ignore"):
+        log_power = np.log(np.abs(power))
+    log_dsum, sign_dsum = _signed_logsumexp(log_terms + log_power[None, :, :],
+                                            signs * np.sign(power)[None, :, :], axis=-1)
+    log_dT = log_dsum - (1.0 - beta) / 2 * K[None, :] * log_t[:, None] - log_t[:, None]
+    return log_T, sign_sum, log_dT, sign_dsum
+
+
+def _rescaled_factors(log_y, sign_y, log_T, sign_T):
+    """
+    Exponentiates the y and t factors so that Y[i,K] * T[j,K] is the (K) term.
+    Each order K is rescaled by the largest |Y| in its column so that the
+    y-side stays within [0, 1]; only genuinely unrepresentable terms overflow.
+    """
+    scale = np.max(log_y, axis=0)
+    scale = np.where(np.isfinite(scale), scale, 0.0)
+    with np.errstate(over="ignore", invalid="ignore"):
+        Y = sign_y * np.exp(log_y - scale[None, :])
+        T = sign_T * np.exp(log_T + scale[None, :])
+    return Y, T
+
+
+def _check_parameters(pr, beta, k0):
+    if pr < 0:
+        raise ValueError("Pr must be non-negative.")
+    if not 0 <= beta <= 1:
+        raise ValueError("β must lie in [0, 1].")
+    if k0 <= 0:
+        raise ValueError("ko(β) must be positive.")
+
+
+# --- k1 = 0: single-variable (Wright function) kernel ---
+
+# |k1| t / ko at or below which the l >= 1 terms are under double rounding
+K1_NEGLIGIBLE = 1e-15
+
+# Terms of the single series, and the error up to which it is used in place
+# of the integral (the x where that is reached depends on α)
+_WRIGHT_TERMS = 64
+_WRIGHT_SERIES_TOLERANCE = 1e-12
+# Gauss-Legendre nodes per panel of the integral
+_WRIGHT_NODES = 24
+# Chebyshev interpolation of the integral: panel width in log(x^(1/(1-α))) and degree
+_WRIGHT_TABLE_WIDTH = 0.25
+_WRIGHT_TABLE_DEGREE = 8
+
+
+def uses_wright_kernel(y, t, k1, k0):
+    """True when theta reduces to the k1 = 0 single-variable form for these inputs."""
+    t = np.asarray(t, dtype=float)
+    t_max = np.max(t[t > 0], initial=0.0)
+    return abs(k1) * t_max / k0 <= K1_NEGLIGIBLE and np.min(y, initial=0.0) >= 0
+
+
+def _kanter_nodes(alpha, n_nodes):
+    """
+    Nodes A(phi) and weights w of theta = sum(w * exp(-x^(1/(1-α)) A(phi))), the
+    Kanter form of the one-sided stable law.  Near phi = π the integrand has a
+    boundary layer of width ~α, so the panels are graded geometrically towards
+    π (ratio 1/8, down to απ/50) with n_nodes Gauss-Legendre nodes each.
+    """
+    x, w = np.polynomial.legendre.leggauss(n_nodes)
+    gaps = [np.pi, np.pi / 2]
+    while gaps[-1] / 8 > alpha * np.pi / 50:
+        gaps.append(gaps[-1] / 8)
+    edges = np.pi - np.array(gaps + [0.0])
+    lo, hi = edges[:-1, None], edges[1:, None]
+    phi = (lo + (x + 1) * (hi - lo) / 2).ravel()
+    weights = (w * (hi - lo) / 2).ravel() / np.pi
+    A = ((np.sin(alpha * phi) / np.sin(phi)) ** (1.0 / (1.0 - alpha))
+         * np.sin((1.0 - alpha) * phi) / np.sin(alpha * phi))
+    return A, weights
+
+
+def _kanter_integral(power, A, weights):
+    values = np.empty(power.size)
+    for start in range(0, power.size, 65536):
+        chunk = power[start:start + 65536]
+        values[start:start + 65536] = np.exp(-chunk[:, None] * A[None, :]) @ weights
+    return values
+
+
+def _kanter_interpolated(power, A, weights):
+    """
+    _kanter_integral through a table: with A0 = min(A) the integral is
+    exp(-p A0) exp(h(p)), where h = log(sum(w exp(-p (A - A0)))) varies slowly
+    and never underflows.  h is interpolated in log p by Chebyshev polynomials
+    on a fixed lattice of panels, so each panel costs _WRIGHT_TABLE_DEGREE + 1
+    exact integrals however many points fall into it (relative error ~1e-13,
+    the rounding of exp(-p A0) itself).
+    """
+    A0 = A.min()
+    # The integral is at most exp(-p A0), which is 0 in double precision here
+    values = np.zeros(power.shape)
+    live = A0 * power < -np.log(np.nextafter(0.0, 1.0))
+    power = power[live]
+    if not power.size:
+        return values
+    s = np.log(power) / _WRIGHT_TABLE_WIDTH
+    panel = np.floor(s).astype(np.int64)
+    first = panel.min()
+    panel -= first
+
+    z = np.cos(np.pi * (np.arange(_WRIGHT_TABLE_DEGREE + 1) + 0.5) / (_WRIGHT_TABLE_DEGREE + 1))
+    nodes = first + np.arange(panel.max() + 1)[:, None] + (z[None, :] + 1) / 2
+    h = np.log(_kanter_integral(np.exp(nodes * _WRIGHT_TABLE_WIDTH).ravel(), A - A0, weights))
+    coefficients = np.polynomial.chebyshev.chebfit(z, h.reshape(nodes.shape).T, _WRIGHT_TABLE_DEGREE)
+
+    # Clenshaw recurrence with each point's panel coefficients
+    z = 2 * (s - first - panel) - 1
+    b1, b2 = np.zeros(s.shape), np.zeros(s.shape)
+    for k in range(_WRIGHT_TABLE_DEGREE, 0, -1):
+        b1, b2 = coefficients[k, panel] + 2 * z * b1 - b2, b1
+    values[live] = np.exp(coefficients[0, panel] + z * b1 - b2 - A0 * power)
+    return values
+
+
+def _wright_coefficients(alpha):
+    """1 / (K! Gamma(1 - αK)) for the _WRIGHT_TERMS orders of the series."""
+    K = np.arange(_WRIGHT_TERMS, dtype=float)
+    return np.exp(-gammaln(K + 1)) * rgamma(1.0 - alpha * K)
+
+
+@functools.lru_cache(maxsize=64)
+def _wright_series_radius(alpha):
+    """
+    Largest x for which the series is within _WRIGHT_SERIES_TOLERANCE: its
+    rounding 2 eps sum|c_K| x^K plus the last two terms (as the truncation
+    estimate) both grow with x, so the bound is bisected once per α.
+    """
+    magnitudes = np.abs(_wright_coefficients(alpha))
+
+    def bound(x):
+        tail = magnitudes[-2] * x ** (_WRIGHT_TERMS - 2) + magnitudes[-1] * x ** (_WRIGHT_TERMS - 1)
+        return 2 * _EPS * np.polynomial.polynomial.polyval(x, magnitudes) + tail
+
+    lo, hi = 0.0, 1.0
+    while bound(hi) <= _WRIGHT_SERIES_TOLERANCE:
+        lo, hi = hi, 2 * hi
+    for _ in range(50):
+        mid = (lo + hi) / 2
+        lo, hi = (mid, hi) if bound(mid) <= _WRIGHT_SERIES_TOLERANCE else (lo, mid)
+    return lo
+
+
+def wright_theta(x, alpha, with_error=False):
+    """
+    W(-x; -α, 1) = sum_K (-x)^K / (K! Gamma(1 - αK)) for x >= 0 and 0 <= α <= 1/2.
+    With with_error, also returns an error estimate (rounding of the series,
+    difference to a 3/4-size rule for the integral); the integral is then
+    evaluated point by point rather than interpolated.
+    """
+    x = np.asarray(x, dtype=float)
+    values = np.empty(x.shape)
+    errors = np.zeros(x.shape)
+
+    if alpha == 0:
+        values = np.exp(-x)
+        errors = _EPS * values
+    else:
+        small = x <= _wright_series_radius(alpha)
+        coefficients = _wright_coefficients(alpha)
+        values[small] = np.polynomial.polynomial.polyval(-x[small], coefficients)
+        if with_error:
+            errors[small] = 2 * _EPS * np.polynomial.polynomial.polyval(x[small], np.abs(coefficients))
+
+        power = x[~small] ** (1.0 / (1.0 - alpha))
+        if with_error:
+            values[~small] = _kanter_integral(power, *_kanter_nodes(alpha, _WRIGHT_NODES))
+            coarse = _kanter_integral(power, *_kanter_nodes(alpha, _WRIGHT_NODES * 3 // 4))
+            errors[~small] = np.abs(values[~small] - coarse) + _EPS
+        else:
+            values[~small] = _kanter_interpolated(power, *_kanter_nodes(alpha, _WRIGHT_NODES))
+
+    return (values, errors) if with_error else values
+
+
+def wright_derivative(x, alpha):
+    """
+    d/dx W(-x; -α, 1) for x >= 0, differentiating wright_theta's series and
+    integral term by term (same nodes, integrand weighted by -A dp/dx).
+    """
+    x = np.asarray(x, dtype=float)
+    if alpha == 0:
+        return -np.exp(-x)
+    values = np.empty(x.shape)
+    small = x <= _wright_series_radius(alpha)
+    coefficients = _wright_coefficients(alpha)
+    values[small] = -np.polynomial.polynomial.polyval(-x[small], np.polynomial.polynomial.polyder(coefficients))
+
+    power = x[~small] ** (1.0 / (1.0 - alpha))
+    A, weights = _kanter_nodes(alpha, _WRIGHT_NODES)
+    values[~small] = -power / ((1.0 - alpha) * x[~small]) * _kanter_integral(power, A, weights * A)
+    return values
+
+
+def _wright_argument(y, t, pr, beta, k0):
+    """x = y sqrt(Pr/ko) t^(-α); nan where t <= 0."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(t > 0, y * np.sqrt(pr / k0) * t ** (-(1.0 - beta) / 2), np.nan)
+
+
+@timed("theta.wright")
+def theta_wright(y, t, pr, beta, k0):
+    """
+    Evaluates theta(y,t) for k1 = 0 point by point (y >= 0).
+    y and t are broadcast against each other; the result has their broadcast shape.
+    """
+    _check_parameters(pr, beta, k0)
+    y, t = np.broadcast_arrays(np.asarray(y, dtype=float), np.asarray(t, dtype=float))
+    x = _wright_argument(y, t, pr, beta, k0)
+    count("theta.wright_points", x.size)
+    values = np.full(x.shape, np.nan)
+    valid = np.isfinite(x)
+    values[valid] = wright_theta(x[valid], (1.0 - beta) / 2)
+    return values
+
+
+@timed("theta.wright")
+def theta_wright_grid(y, t, pr, beta, k0):
+    """
+    theta_wright on the outer grid of 1-D arrays y (>= 0) and t.  x = a_i b_j
+    with a = y sqrt(Pr/ko) and b = t^(-α), so the series part is the product
+    of a (len(y), K) and a (K, len(t)) matrix instead of a sum per point;
+    only the points beyond the series radius go through the integral.
+    """
+    _check_parameters(pr, beta, k0)
+    alpha = (1.0 - beta) / 2
+    y = np.atleast_1d(np.asarray(y, dtype=float))
+    t = np.atleast_1d(np.asarray(t, dtype=float))
+    a = y * np.sqrt(pr / k0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        b = np.where(t > 0, t ** -alpha, np.nan)
+    x = a[:, None] * b[None, :]
+    count("theta.wright_points", x.size)
+    if alpha == 0:
+        return np.exp(-x)
+
+    values = np.full(x.shape, np.nan)
+    small = x <= _wright_series_radius(alpha)
+    if small.any():
+        # Rows scaled into [-1, 0] so that only extreme a_max * b overflows
+        scale = max(a.max(), np.finfo(float).tiny)
+        with np.errstate(over="ignore", invalid="ignore"):
+            Y = np.vander(-a / scale, _WRIGHT_TERMS, increasing=True)
+            T = np.vander(b * scale, _WRIGHT_TERMS, increasing=True) * _wright_coefficients(alpha)
+            series = Y @ T.T
+        values = np.where(small, series, values)
+        # Points the product could not represent are summed one by one
+        redo = small & ~np.isfinite(series)
+        if redo.any():
+            values[redo] = wright_theta(x[redo], alpha)
+    large = np.isfinite(x) & ~small
+    if large.any():
+        power = x[large] ** (1.0 / (1.0 - alpha))
+        values[large] = _kanter_interpolated(power, *_kanter_nodes(alpha, _WRIGHT_NODES))
+    return values
+
+
+def _wright_fields(y, t, pr, beta, k0):
+    """theta_fields computed with the k1 = 0 kernel: theta = W(-x), x = y sqrt(Pr/ko) t^(-α)."""
+    alpha = (1.0 - beta) / 2
+    x = _wright_argument(y, t, pr, beta, k0)
+    count("theta.wright_points", x.size)
+    value, slope = np.full(x.shape, np.nan), np.full(x.shape, np.nan)
+    valid = np.isfinite(x)
+    value[valid] = wright_theta(x[valid], alpha)
+    slope[valid] = wright_derivative(x[valid], alpha)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dtheta_dy = slope * np.sqrt(pr / k0) * t ** (-alpha)
+        dtheta_dt = np.where(x > 0, slope * -alpha * x / t, 0.0)
+    return ThetaFields(value, dtheta_dy, np.where(valid, dtheta_dt, np.nan))
+
+
+@timed("theta.series")
+def theta_grid(y, t, pr, beta, k1, k0, n_k=DEFAULT_K_TERMS, n_l=DEFAULT_L_TERMS, tables=None):
+    """
+    Evaluates theta(y,t) from Eq (30) on the outer grid of 1-D arrays y and t.
+    Returns an array of shape (len(y), len(t)).  t must be positive.
+    """
+    _check_parameters(pr, beta, k0)
+    y = np.atleast_1d(np.asarray(y, dtype=float))
+    t = np.atleast_1d(np.asarray(t, dtype=float))
+    if uses_wright_kernel(y, t, k1, k0):
+        return theta_wright_grid(y, t, pr, beta, k0)
+
+    count("theta.series_points", y.size * t.size)
+    tables = tables or default_tables
+    K = np.arange(1, n_k + 1, dtype=float)
+    log_table, sign_table = tables.log_terms(beta, n_k, n_l)
+
+    log_y, sign_y = _y_factors(y, pr, k0, K)
+    log_T, sign_T = _t_factors(t, beta, k1, k0, log_table, sign_table)
+    Y, T = _rescaled_factors(log_y, sign_y, log_T, sign_T)
+    with np.errstate(invalid="ignore"):
+        return 1.0 + Y @ T.T
+
+
+@timed("theta.series")
+def theta(y, t, pr, beta, k1, k0, n_k=DEFAULT_K_TERMS, n_l=DEFAULT_L_TERMS, tables=None):
+    """
+    Evaluates theta(y,t) from Eq (30) point by point.
+    y and t are broadcast against each other; the result has their broadcast shape.
+    Distinct y and t values are factored once and then paired up.
+    """
+    _check_parameters(pr, beta, k0)
+    y, t = np.broadcast_arrays(np.asarray(y, dtype=float), np.asarray(t, dtype=float))
+    if uses_wright_kernel(y, t, k1, k0):
+        return theta_wright(y, t, pr, beta, k0)
+    count("theta.series_points", y.size)
+    y_values, y_index = np.unique(y, return_inverse=True)
+    t_values, t_index = np.unique(t, return_inverse=True)
+
+    tables = tables or default_tables
+    K = np.arange(1, n_k + 1, dtype=float)
+    log_table, sign_table = tables.log_terms(beta, n_k, n_l)
+
+    log_y, sign_y = _y_factors(y_values, pr, k0, K)
+    log_T, sign_T = _t_factors(t_values, beta, k1, k0, log_table, sign_table)
+
+    Y, T = _rescaled_factors(log_y, sign_y, log_T, sign_T)
+    y_index, t_index = y_index.ravel(), t_index.ravel()
+    values = np.empty(y_index.size)
+    for start in range(0, y_index.size, BATCH_SIZE):
+        stop = start + BATCH_SIZE
+        with np.errstate(invalid="ignore"):
+            values[start:stop] = 1.0 + np.einsum("ik,ik->i", Y[y_index[start:stop]],
+                                                 T[t_index[start:stop]])
+    return values.reshape(y.shape)
+
+
+# --- Derivatives ---
+
+ThetaFields = namedtuple("ThetaFields", ["theta", "dtheta_dy", "dtheta_dt"])
+
+
+@timed("theta.fields")
+def theta_fields(y, t, pr, beta, k1, k0, n_k=DEFAULT_K_TERMS, n_l=DEFAULT_L_TERMS, tables=None):
+    """
+    Evaluates theta, dtheta/dy and dtheta/dt from Eq (30) on the outer grid of
+    1-D arrays y and t, differentiating the series term by term.  The three
+    share the coefficient table and the l sums (one pass for theta and
+    dtheta/dt).  Returns ThetaFields of arrays of shape (len(y), len(t)).
+    """
+    _check_parameters(pr, beta, k0)
+    y = np.atleast_1d(np.asarray(y, dtype=float))
+    t = np.atleast_1d(np.asarray(t, dtype=float))
+    if uses_wright_kernel(y, t, k1, k0):
+        return _wright_fields(y[:, None], t[None, :], pr, beta, k0)
+
+    count("theta.series_points", y.size * t.size)
+    tables = tables or default_tables
+    K = np.arange(1, n_k + 1, dtype=float)
+    log_table, sign_table = tables.log_terms(beta, n_k, n_l)
+
+    log_y, sign_y = _y_factors(y, pr, k0, K)
+    log_dy, sign_dy = _dy_factors(y, pr, k0, K)
+    log_T, sign_T, log_dT, sign_dT = _t_factors(t, beta, k1, k0, log_table, sign_table, derivative=True)
+    Y, T = _rescaled_factors(log_y, sign_y, log_T, sign_T)
+    _, dT = _rescaled_factors(log_y, sign_y, log_dT, sign_dT)
+    dY, T_dy = _rescaled_factors(log_dy, sign_dy, log_T, sign_T)
+    with np.errstate(invalid="ignore"):
+        # theta and dtheta/dt in one product
+        both = Y @ np.concatenate([T, dT]).T
+        dtheta_dy = dY @ T_dy.T
+    return ThetaFields(1.0 + both[:, :t.size], dtheta_dy, both[:, t.size:])
+
+
+def wall_flux(t, pr, beta, k1, k0, n_l=DEFAULT_L_TERMS, tables=None):
+    """
+    The wall heat flux -dtheta/dy at y = 0 (Nusselt-type), from the K = 1 terms
+    of Eq (30): sqrt(Pr/ko) t^(-(1-β)/2) sum_l c[1,l] (-k1 t/ko)^l / Gamma(1 - (1-β)/2 + l).
+    t may be any array; nan where t <= 0.
+    """
+    _check_parameters(pr, beta, k0)
+    t = np.asarray(t, dtype=float)
+    tables = tables or default_tables
+    log_table, sign_table = tables.log_terms(beta, 1, n_l)
+    log_T, sign_T = _t_factors(t.ravel(), beta, k1, k0, log_table, sign_table)
+    with np.errstate(over="ignore", invalid="ignore"):
+        flux = np.sqrt(pr / k0) * sign_T[:, 0] * np.exp(log_T[:, 0])
+    flux[~(t.ravel() > 0)] = np.nan
+    return flux.reshape(t.shape)
+
+
+# --- Adaptive truncation ---
+
+SeriesResult = namedtuple("SeriesResult", ["value", "error", "k_terms", "terms"])
+
+# Terms are added in blocks of this many K (or l) at a time
+_BLOCK = 16
+_EPS = np.finfo(float).eps
+
+
+def _new_sum_state(shape):
+    """
+    Running signed sum kept as (peak, total, compensation, abs_total, round_total):
+    value = (total + comp) * e^peak, sum of |terms| = abs_total * e^peak, and
+    round_total * e^peak * eps bounds the rounding error of the terms themselves.
+    """
+    return (np.full(shape, -np.inf), np.zeros(shape), np.zeros(shape), np.zeros(shape), np.zeros(shape))
+
+
+def _accumulate(state, log_terms, signs, log_cond):
+    """
+    Adds a block of terms sign * exp(log_terms) (last axis) into a running sum.
+    The running scale follows the largest term seen so nothing overflows, and
+    block sums are combined with Neumaier compensation.  log_cond is the size of
+    the pieces that went into each log term: exponentiating turns their absolute
+    rounding error into a relative error of about eps * log_cond.
+    Returns the new state and the log of the largest term in the block.
+    """
+    peak, total, comp, abs_total, round_total = state
+    masked = np.where(signs != 0, log_terms, -np.inf)
+    block_peak = np.max(masked, axis=-1)
+    new_peak = np.maximum(peak, block_peak)
+    new_peak = np.where(np.isfinite(new_peak), new_peak, 0.0)
+
+    with np.errstate(invalid="ignore"):
+        rescale = np.exp(peak - new_peak)
+    values = signs * np.exp(masked - new_peak[..., None])
+    block_sum = np.sum(values, axis=-1)
+
+    total, comp = total * rescale, comp * rescale
+    new_total = total + block_sum
+    comp = comp + np.where(np.abs(total) >= np.abs(block_sum),
+                           (total - new_total) + block_sum,
+                           (block_sum - new_total) + total)
+    abs_total = abs_total * rescale + np.sum(np.abs(values), axis=-1)
+    round_total = round_total * rescale + np.sum(np.abs(values) * (2.0 + log_cond), axis=-1)
+    return (new_peak, new_total, comp, abs_total, round_total), block_peak
+
+
+def _log_tail(block_peak, prev_peak):
+    """
+    Estimated log of everything after the current block.  Once the largest term
+    per block is falling, the series is past its peak and the tail is bounded by
+    a geometric series in the block-to-block ratio.  Returns +inf before that.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_ratio = block_peak - prev_peak
+        past_peak = np.isfinite(prev_peak) & (block_peak < prev_peak)
+        log_ratio = np.where(past_peak, log_ratio, 0.0)
+        log_tail = block_peak + np.log(_BLOCK) + log_ratio - np.log1p(-np.exp(log_ratio))
+    log_tail = np.where(past_peak & ~np.isfinite(block_peak), -np.inf, log_tail)
+    return np.where(past_peak, log_tail, np.inf)
+
+
+def _log_value(state):
+    peak, total, comp = state[:3]
+    with np.errstate(divide="ignore"):
+        return peak + np.log(np.abs(total + comp)), np.sign(total + comp)
+
+
+def _adaptive_t_factors(t, K, beta, k1, k0, max_l, tables):
+    """
+    T_K(t) for every t (n_t,) and order K (n_b,), summing over l only until the
+    tail is below rounding level relative to the terms already added.
+    The K,l terms are read from the coefficient tables.
+    Returns log|T|, sign, log(error bound) and the number of l terms used,
+    each of shape (n_t, n_b).
+    """
+    shape = (len(t), len(K))
+    with np.errstate(divide="ignore"):
+        log_t = np.log(t)
+        log_z = np.log(np.abs(k1 / k0)) + log_t
+    sign_z = -np.sign(k1)
+    if k1 == 0:
+        max_l = 1  # Only the l = 0 term survives
+
+    state = _new_sum_state(shape)
+    prev_peak = np.full(shape, -np.inf)
+    log_tail = np.full(shape, np.inf)
+    l_used = np.zeros(shape, dtype=np.int64)
+    active = np.ones(shape, dtype=bool)
+    k_rows = K.astype(np.int64) - 1
+    n_k = int(K.max())
+
+    for l0 in range(0, max_l, _BLOCK):
+        idx = np.nonzero(active)
+        if idx[0].size == 0:
+            break
+        l_end = min(l0 + _BLOCK, max_l)
+        l = np.arange(l0, l_end, dtype=float)[None, :]
+        log_table, sign_table = tables.log_terms(beta, n_k, l_end)
+        log_coef = tables.log_coefficients(n_k, l_end)
+        rows = k_rows[idx[1]][:, None]
+        cols = np.arange(l0, l_end)[None, :]
+
+        with np.errstate(invalid="ignore"):
+            l_log_z = np.where(l == 0, 0.0, log_z[idx[0]][:, None] * l)
+        log_terms = log_table[rows, cols] + l_log_z
+        signs = sign_table[rows, cols] * sign_z ** l
+        # Rough size of the gammaln/log pieces summed into each log term
+        with np.errstate(invalid="ignore"):
+            log_rg = log_table[rows, cols] - log_coef[rows, cols]
+        log_cond = (2 * (gammaln(K[idx[1]] + 1)[:, None] + gammaln(l + 1))
+                    + np.abs(np.where(np.isfinite(log_rg), log_rg, 0.0))
+                    + np.abs(np.where(np.isfinite(l_log_z), l_log_z, 0.0)))
+
+        sub_state, block_peak = _accumulate(tuple(a[idx] for a in state), log_terms, signs, log_cond)
+        for full, sub in zip(state, sub_state):
+            full[idx] = sub
+        l_used[idx] = l0 + l.shape[1]
+
+        sub_tail = _log_tail(block_peak, prev_peak[idx])
+        if k1 == 0:
+            sub_tail = np.full(sub_tail.shape, -np.inf)
+        log_tail[idx] = sub_tail
+        prev_peak[idx] = np.maximum(prev_peak[idx], block_peak)
+        log_scale = sub_state[0] + np.log(np.maximum(sub_state[3], _EPS))
+        active[idx] = ~(sub_tail <= np.log(_EPS) + log_scale)
+
+    log_T, sign_T = _log_value(state)
+    log_T = log_T - (1.0 - beta) / 2 * K[None, :] * log_t[:, None]
+    # Truncation tail plus accumulated rounding, scaled like T itself
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_err = np.logaddexp(log_tail, state[0] + np.log(_EPS * state[4]))
+    log_err = log_err - (1.0 - beta) / 2 * K[None, :] * log_t[:, None]
+    return log_T, sign_T, log_err, l_used
+
+
+@timed("theta.adaptive")
+def theta_adaptive(y, t, pr, beta, k1, k0, tol=1e-10, max_k=4096, max_l=4096, tables=None):
+    """
+    Evaluates theta(y,t) from Eq (30), choosing the K and l truncation per point.
+
+    The l sums (which depend only on t and K) are extended until their tail is
+    at rounding level; the K sum for each (y,t) point until its estimated tail
+    is below tol.  All sums are kept in log scale with compensated accumulation.
+
+    Returns a SeriesResult of arrays with the broadcast shape of y and t:
+    value, error (truncation estimate plus rounding/cancellation bound),
+    k_terms (K orders used) and terms (total K,l terms evaluated).
+    error is inf where max_k/max_l were reached before convergence.
+    When k1 is negligible the single-variable kernel is used instead
+    (k_terms = 0, terms = series terms or quadrature nodes per point).
+    """
+    _check_parameters(pr, beta, k0)
+    tables = tables or default_tables
+    y, t = np.broadcast_arrays(np.asarray(y, dtype=float), np.asarray(t, dtype=float))
+    shape = y.shape
+    if uses_wright_kernel(y, t, k1, k0):
+        return _wright_result(y, t, pr, beta, k0)
+    y_values, y_index = np.unique(y, return_inverse=True)
+    t_values, t_index = np.unique(t, return_inverse=True)
+    y_index, t_index = y_index.ravel(), t_index.ravel()
+    n = y_index.size
+    count("theta.adaptive_points", n)
+
+    state = _new_sum_state(n)
+    prev_peak = np.full(n, -np.inf)
+    log_tail = np.full(n, np.inf)
+    log_inner_err = np.full(n, -np.inf)
+    k_terms = np.zeros(n, dtype=np.int64)
+    terms = np.zeros(n, dtype=np.int64)
+
+    # theta = 1 exactly where every K >= 1 term vanishes; t <= 0 is outside the series
+    trivial = (y_values[y_index] == 0) | (pr == 0)
+    invalid = ~(t_values[t_index] > 0)
+    log_tail[trivial] = -np.inf
+    active = ~(trivial | invalid)
+
+    for K0 in range(1, max_k + 1, _BLOCK):
+        points = np.nonzero(active)[0]
+        if points.size == 0:
+            break
+        K = np.arange(K0, min(K0 + _BLOCK, max_k + 1), dtype=float)
+
+        # l sums only for the t values that still have unconverged points
+        t_needed, t_local = np.unique(t_index[points], return_inverse=True)
+        log_T, sign_T, log_T_err, l_used = _adaptive_t_factors(
+            t_values[t_needed], K, beta, k1, k0, max_l, tables)
+        log_Y, sign_Y = _y_factors(y_values, pr, k0, K)
+
+        iy = y_index[points]
+        log_terms = log_Y[iy] + log_T[t_local]
+        signs = sign_Y[iy] * sign_T[t_local]
+        # log_T's own rounding is already in log_T_err; this covers the y factor and t power
+        log_cond = np.abs(log_Y[iy]) + np.abs((1.0 - beta) / 2 * K[None, :] * np.log(t_values[t_needed])[t_local][:, None])
+        sub_state, block_peak = _accumulate(tuple(a[points] for a in state), log_terms, signs,
+                                            np.where(np.isfinite(log_cond), log_cond, 0.0))
+        for full, sub in zip(state, sub_state):
+            full[points] = sub
+
+        with np.errstate(invalid="ignore"):
+            block_err = np.logaddexp.reduce(log_Y[iy] + log_T_err[t_local], axis=-1)
+            log_inner_err[points] = np.logaddexp(log_inner_err[points], block_err)
+        k_terms[points] = K0 + len(K) - 1
+        terms[points] += l_used[t_local].sum(axis=-1)
+
+        sub_tail = _log_tail(block_peak, prev_peak[points])
+        log_tail[points] = sub_tail
+        prev_peak[points] = np.maximum(prev_peak[points], block_peak)
+        active[points] = ~(sub_tail <= np.log(tol))
+
+    log_sum, sign_sum = _log_value(state)
+    with np.errstate(over="ignore", invalid="ignore"):
+        value = 1.0 + sign_sum * np.exp(log_sum)
+        # Rounding of the terms (with some head-room) plus the final 1 + sum
+        rounding = 4 * _EPS * state[4] * np.exp(state[0]) + _EPS * np.abs(value)
+        error = np.exp(log_tail) + np.exp(log_inner_err) + rounding
+    value[invalid] = np.nan
+    error[invalid] = np.nan
+    return SeriesResult(value.reshape(shape), error.reshape(shape),
+                        k_terms.reshape(shape), terms.reshape(shape))
+
+
+def _wright_result(y, t, pr, beta, k0):
+    """theta_adaptive's SeriesResult computed with the k1 = 0 kernel."""
+    alpha = (1.0 - beta) / 2
+    x = _wright_argument(y, t, pr, beta, k0)
+    count("theta.wright_points", x.size)
+    value = np.full(x.shape, np.nan)
+    error = np.full(x.shape, np.nan)
+    valid = np.isfinite(x)
+    value[valid], error[valid] = wright_theta(x[valid], alpha, with_error=True)
+    nodes = _kanter_nodes(alpha, _WRIGHT_NODES)[0].size if beta < 1 else 1
+    terms = np.where(x <= _wright_series_radius(alpha), _WRIGHT_TERMS, nodes * 7 // 4)
+    return SeriesResult(value, error, np.zeros(x.shape, dtype=np.int64), terms.astype(np.int64))
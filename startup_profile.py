@@ -0,0 +1,66 @@
+"""
+Measures the import cost of each module the app loads, per startup stage.
+
+Each stage is imported in a fresh interpreter with `python -X importtime`,
+so the numbers are cold-start costs (minus PyInstaller's unpacking):
+
+    python startup_profile.py            # top 15 modules per stage
+    python startup_profile.py --top 40
+
+Stages:
+    window     what laplace.py imports before the window appears
+    renderer   loaded in the background once the window is shown
+    pdf        loaded when "Download PDF" is first clicked
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+STAGES = [
+    ("window", "import laplace"),
+    ("renderer", "import laplace, mathrender"),
+    ("pdf", "import laplace, mathrender, report"),
+]
+
+
+def package_costs(statement):
+    """
+    Returns {top-level package: microseconds} for a fresh `python -c statement`.
+    Each module's own (self) import time is charged to its top-level package.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, MPLBACKEND="Agg")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            cwd=here, env=env, capture_output=True, text=True, check=True)
+    costs = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        root = name.strip().split(".")[0]
+        costs[root] = costs.get(root, 0) + int(self_us)
+    return costs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import cost per module and startup stage.")
+    parser.add_argument("--top", type=int, default=15, help="modules to list per stage")
+    args = parser.parse_args(argv)
+
+    previous = {}
+    for stage, statement in STAGES:
+        costs = package_costs(statement)
+        # Only what this stage adds on top of the previous one
+        added = {name: us for name, us in costs.items() if name not in previous}
+        total_ms = sum(added.values()) / 1000
+        print(f"== {stage}: +{total_ms:.0f} ms ({statement})")
+        for name, us in sorted(added.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"   {us / 1000:8.1f} ms  {name}")
+        previous = costs
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Parameter sweeps of theta(y,t) over the Cartesian product of (Pr, β, k1, ko).
+
+Every (Pr, β, k1, ko) combination is one task that fills a (y, t) grid.  The
+result is a single .npy file of shape (n_pr, n_beta, n_k1, n_k0, n_y, n_t)
+that every worker opens memory-mapped and writes its slices into directly,
+so nothing but task indices crosses the process boundary.  Next to it a
+.done.npy mask records finished tasks and a .sweep.json manifest records the axes;
+re-running the same sweep skips what is already done.
+
+The default evaluator is the Talbot inversion, which is accurate to about
+1e-9 over the whole grid (NaN in the rare cells it cannot resolve) but needs
+k1 >= 0 (use --method adaptive otherwise).  The adaptive double series may
+not converge (|theta| >> 1) for large Pr, small β or small t; cells whose
+error estimate exceeds MAX_ERROR are stored as NaN rather than as numbers.
+The fixed-truncation series is not offered: checking it takes the adaptive
+sum anyway.  Each worker process runs BLAS single-threaded, so the processes
+don't compete for cores.
+
+    python sweep.py --pr 0.71,7 --beta 0:0.9:10 --k1 0,1,2.5 --k0 1 \\
+        --y 0:3:301 --t 0.05:5:200 --out theta.npy
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from series import default_tables, theta_adaptive
+from inverse_laplace import theta_talbot_grid
+
+
+# --- Sweep axes, in output-array order ---
+PARAMETER_AXES = ("pr", "beta", "k1", "k0")
+GRID_AXES = ("y", "t")
+
+METHODS = ("adaptive", "talbot")
+DEFAULT_METHOD = "talbot"
+
+# Adaptive cells with a larger error estimate are stored as NaN
+MAX_ERROR = 1e-6
+
+# Thread-count variables of the common BLAS builds, pinned to 1 in the workers
+BLAS_THREAD_VARIABLES = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+                         "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+# Tasks handed to a worker at a time (tasks sharing a β stay together)
+CHUNK_SIZE = 8
+
+
+def parse_axis(text):
+    """
+    Parses "a,b,c" as a list of values or "start:stop:count" as np.linspace.
+    """
+    text = text.strip()
+    if ":" in text:
+        start, stop, count = text.split(":")
+        return np.linspace(float(start), float(stop), int(count))
+    return np.array([float(value) for value in text.split(",") if value.strip()])
+
+
+def sweep_paths(out_path):
+    """Returns the (manifest, done-mask) paths that go with an output .npy."""
+    root = os.path.splitext(out_path)[0]
+    return root + ".sweep.json", root + ".done.npy"
+
+
+def _manifest(axes, method):
+    return {"method": method, "axes": {name: [float(v) for v in axes[name]]
+                                       for name in PARAMETER_AXES + GRID_AXES}}
+
+
+def open_sweep(out_path, axes, method=DEFAULT_METHOD):
+    """
+    Creates the output, done mask and manifest for a sweep, or reopens them if
+    a sweep with the same axes and method was started before.  Returns the
+    done mask (read-only copy).
+    """
+    manifest_path, done_path = sweep_paths(out_path)
+    manifest = _manifest(axes, method)
+    shape = tuple(len(axes[name]) for name in PARAMETER_AXES + GRID_AXES)
+
+    if os.path.exists(manifest_path) and os.path.exists(out_path) and os.path.exists(done_path):
+        with open(manifest_path, encoding="utf-8") as fh:
+            if json.load(fh) == manifest:
+                return np.array(np.load(done_path, mmap_mode="r"))
+        print(f"Warning: {out_path} holds a different sweep; starting over.")
+
+    np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float64, shape=shape).flush()
+    done = np.lib.format.open_memmap(done_path, mode="w+", dtype=np.uint8, shape=shape[:4])
+    done.flush()
+    with open(manifest_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh)
+    return np.zeros(shape[:4], dtype=np.uint8)
+
+
+# --- Worker processes ---
+
+_worker = {}
+
+
+def _init_worker(out_path, axes, method):
+    """Opens the shared output and done mask once per worker process."""
+    try:
+        # Also limits a BLAS that was loaded before the environment was set
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    _, done_path = sweep_paths(out_path)
+    _worker["out"] = np.load(out_path, mmap_mode="r+")
+    _worker["done"] = np.load(done_path, mmap_mode="r+")
+    _worker["axes"] = axes
+    _worker["method"] = method
+
+
+def evaluate_grid(y, t, pr, beta, k1, k0, method=DEFAULT_METHOD, tables=None, max_error=MAX_ERROR):
+    """
+    theta on the (y, t) outer grid with the chosen evaluator.  Adaptive cells
+    are NaN where the error estimate exceeds max_error.
+    """
+    if method == "talbot":
+        return theta_talbot_grid(y, t, pr, beta, k1, k0)
+    result = theta_adaptive(y[:, None], t[None, :], pr, beta, k1, k0, tables=tables)
+    with np.errstate(invalid="ignore"):
+        return np.where(result.error <= max_error, result.value, np.nan)
+
+
+def _run_tasks(tasks):
+    """Fills the output slices for a list of (i_pr, i_beta, i_k1, i_k0) tasks."""
+    out, done, axes = _worker["out"], _worker["done"], _worker["axes"]
+    for index in tasks:
+        pr, beta, k1, k0 = (axes[name][i] for name, i in zip(PARAMETER_AXES, index))
+        out[index] = evaluate_grid(axes["y"], axes["t"], pr, beta, k1, k0,
+                                   _worker["method"], default_tables)
+        # The data has to be on disk before the task counts as done
+        out.flush()
+        done[index] = 1
+        done.flush()
+    return len(tasks)
+
+
+def run_sweep(axes, out_path, method=DEFAULT_METHOD, workers=None, progress=None):
+    """
+    Evaluates theta over every (Pr, β, k1, ko) combination of axes (a dict of
+    1-D arrays keyed pr, beta, k1, k0, y, t) into the .npy at out_path.
+    Already finished combinations are skipped.  progress(done, total) is called
+    as tasks finish.  Returns the result opened read-only.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    axes = {name: np.atleast_1d(np.asarray(axes[name], dtype=float))
+            for name in PARAMETER_AXES + GRID_AXES}
+
+    done = open_sweep(out_path, axes, method)
+    # β-major order keeps each worker on few β values (one table per β)
+    todo = [index for index in np.ndindex(done.shape) if not done[index]]
+    todo.sort(key=lambda index: (index[1], index))
+    total = done.size
+    finished = total - len(todo)
+    if progress is not None:
+        progress(finished, total)
+
+    if todo:
+        chunks = [todo[i:i + CHUNK_SIZE] for i in range(0, len(todo), CHUNK_SIZE)]
+        workers = min(workers or os.cpu_count() or 1, len(chunks))
+        # Spawned workers see these before NumPy loads its BLAS; restored afterwards
+        saved = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+        os.environ.update({name: "1" for name in BLAS_THREAD_VARIABLES})
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(out_path, axes, method)) as pool:
+                futures = [pool.submit(_run_tasks, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    finished += future.result()
+                    if progress is not None:
+                        progress(finished, total)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+    return np.load(out_path, mmap_mode="r")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep theta(y,t) over Pr, β, k1 and ko.")
+    for name in PARAMETER_AXES + GRID_AXES:
+        parser.add_argument(f"--{name}", required=True,
+                            help='comma-separated values or "start:stop:count"')
+    parser.add_argument("--out", required=True, help="output .npy (re-run to resume)")
+    parser.add_argument("--method", choices=METHODS, default=DEFAULT_METHOD,
+                        help=f"talbot or adaptive (double series, any k1); default: {DEFAULT_METHOD}")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    try:
+        axes = {name: parse_axis(getattr(args, name)) for name in PARAMETER_AXES + GRID_AXES}
+    except ValueError as e:
+        print(f"Error parsing sweep axes: {e}")
+        return 1
+
+    start = time.perf_counter()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} combinations ({time.perf_counter() - start:.1f} s)",
+              end="", flush=True)
+
+    try:
+        result = run_sweep(axes, args.out, args.method, args.workers, progress)
+    except ValueError as e:
+        print(f"\nError running sweep: {e}")
+        return 1
+    print(f"\nWrote {result.shape} to {args.out}")
+    unresolved = int(np.isnan(result).sum())
+    if unresolved:
+        print(f"Warning: {unresolved} cells did not reach the error tolerance {MAX_ERROR:g} and are stored as NaN.")
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())